@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'storeapp.middleware.PrincipalMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -73,10 +75,18 @@ WSGI_APPLICATION = 'store.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Write transactions take SQLite's write lock when they begin. In the default
+# deferred mode two overlapping checkouts would both read, then both try to
+# upgrade to a write lock, and one would fail at once with "database is
+# locked"; this way the second waits (up to `timeout` seconds) for the first.
+# Tests use a file rather than the in-memory database so that threads really
+# contend for that lock (see ConcurrentCheckoutTests).
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'store_test.sqlite3')},
     }
 }
 
@@ -117,12 +127,48 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS=['static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes every file under a content-hashed name (app.3f2a….css) plus
+# .br/.gz copies of the text files, and {% static %} links to the hashed name.
+# store/wsgi.py serves them with immutable cache headers (storeapp/static_serving.py).
+# static/css and static/fonts are built by `python manage.py build_assets`.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'storeapp.storage.PrecompressedManifestStaticFilesStorage',
+    },
+}
 
 
 MEDIA_URL='/media/'
 MEDIA_ROOT=os.path.join(BASE_DIR,'media')
 
 
+# Cache shared by every worker process on the host, so when one worker bumps a
+# namespace version (storeapp/caching.py) the others stop serving the old
+# entries too. A per-process LocMemCache would keep them until they expire.
+# Point this at Redis or Memcached once the site runs on more than one host.
+# Reads are cheap; a write may list the folder to cull it, which
+# storeapp.cache_backends.FileCache only does every CULL_EVERY writes.
+CACHES = {
+    'default': {
+        'BACKEND': 'storeapp.cache_backends.FileCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 3, 'CULL_EVERY': 100},
+    }
+}
+
+
+# How long stock stays held for a customer after the checkout page is shown
+STOCK_RESERVATION_MINUTES = 15
+
+# Delivered/cancelled orders older than this move to the archive tables (`manage.py archive_orders`)
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -31,6 +31,7 @@ urlpatterns = [
     path('products/', views.products_page, name='products'),
     path('about/', views.about, name='about'),
     path('community/', views.community, name='community'),
+    path('community/feed/', views.community_feed, name='community_feed'),
     path('cart/', views.cart, name='cart'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/update/<int:item_id>/<str:action>/', views.update_cart, name='update_cart'),
@@ -53,6 +54,17 @@ urlpatterns = [
     path('admin/post/add/', views.add_post, name='add_post'),
     path('admin/post/update/<int:post_id>/', views.update_post, name='update_post'),
     path('admin/post/delete/<int:post_id>/', views.delete_post, name='delete_post'),
+    path('admin/export/<slug:export_name>.csv', views.export_sales, name='export_sales'),
+    path('admin/orders/update/', views.admin_update_orders, name='admin_update_orders'),
+    path('admin/tabs/orders/', views.admin_orders, name='admin_orders'),
+    path('admin/tabs/customers/', views.admin_customers, name='admin_customers'),
+    path('admin/tabs/sellers/', views.admin_sellers, name='admin_sellers'),
+    path('admin/tabs/approvals/', views.admin_pending_sellers, name='admin_pending_sellers'),
+    path('admin/tabs/posts/', views.admin_posts, name='admin_posts'),
+    path('admin/tabs/report/', views.admin_report, name='admin_report'),
+    path('admin/tabs/report/products/', views.admin_report_products, name='admin_report_products'),
+    path('admin/tabs/report/sellers/', views.admin_report_sellers, name='admin_report_sellers'),
+    path('admin/tabs/trends/', views.admin_trends, name='admin_trends'),
 
 
     #--- Seller Panel URLs ---
@@ -60,8 +72,12 @@ urlpatterns = [
     path('seller/product/add/', views.add_product, name='add_product'),
     path('seller/product/update/<int:product_id>/', views.update_product, name='update_product'),
     path('seller/product/delete/<int:product_id>/', views.delete_product, name='delete_product'),
+    path('seller/products/import/', views.import_products, name='import_products'),
+    path('seller/products/import/template.csv', views.product_import_template, name='product_import_template'),
+    path('seller/products/bulk-update/', views.bulk_update_products, name='bulk_update_products'),
     path('seller/order/confirm/<int:order_id>/', views.confirm_order, name='confirm_order'),
     path('seller/order/delete/<int:order_id>/', views.delete_order, name='delete_order'),
+    path('seller/orders/update/', views.update_seller_orders, name='update_seller_orders'),
     path('seller/feedback/delete/<int:feedback_id>/', views.delete_feedback, name='delete_feedback'),
 
 
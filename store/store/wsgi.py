@@ -26,4 +26,8 @@ if path not in sys.path:
 os.environ['DJANGO_SETTINGS_MODULE'] = 'store.settings' # Adjust if your settings are elsewhere
 
 from django.core.wsgi import get_wsgi_application
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Serve collected static files (precompressed, immutable when hashed) and media without going through Django
+from storeapp.static_serving import StaticFilesApplication
+application = StaticFilesApplication(application)
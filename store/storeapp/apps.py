@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
 
 
 class StoreappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'storeapp'
+
+    def ready(self):
+        from . import images, signals
+        from .models import Customer, Feedback, Product, Seller
+
+        post_migrate.connect(signals.restore_search_triggers, sender=self)
+        for model in (Product, Seller):
+            post_save.connect(signals.catalog_changed, sender=model)
+            post_delete.connect(signals.catalog_changed, sender=model)
+        for model in (Customer, Seller):
+            post_save.connect(signals.principal_changed, sender=model)
+            post_delete.connect(signals.principal_changed, sender=model)
+        post_save.connect(signals.seller_saved, sender=Seller)
+        post_save.connect(signals.product_stock_changed, sender=Product)
+        post_delete.connect(signals.product_stock_changed, sender=Product)
+        post_save.connect(signals.feedback_changed, sender=Feedback)
+        post_delete.connect(signals.feedback_changed, sender=Feedback)
+        for model, _ in images.IMAGE_FIELDS:
+            pre_save.connect(signals.image_changing, sender=model)
+            post_save.connect(signals.image_saved, sender=model)
+            post_delete.connect(signals.image_deleted, sender=model)
@@ -0,0 +1,91 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from . import seller_stats
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusChange, ArchivedPayment, ArchivedSellerOrder,
+    Order, OrderItem, OrderStatus, OrderStatusChange, Payment, SellerOrder,
+)
+
+# --- Order archive ---
+#
+# Closed orders (delivered or cancelled) older than ORDER_ARCHIVE_AFTER_DAYS
+# are moved, together with their items, payment, seller orders and status
+# log, into the Archived* tables. Each batch is copied and deleted in one
+# transaction, keeping ids, so nothing is ever in both tables or in neither.
+# Open orders stay where they are however old they get.
+#
+# The sales rollups, seller stats and order-items export read both tables,
+# so their figures don't change when orders are archived. Customers still
+# see archived orders: order_detail and my_orders fall back to the archive.
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+ARCHIVE_BATCH_SIZE = 500
+CLOSED_STATUSES = [OrderStatus.DELIVERED, OrderStatus.CANCELLED]
+
+# (live model, archive model, lookup from the live model to the order id), parents first
+ARCHIVED_MODELS = [
+    (Order, ArchivedOrder, 'id'),
+    (OrderItem, ArchivedOrderItem, 'order_id'),
+    (Payment, ArchivedPayment, 'order_id'),
+    (SellerOrder, ArchivedSellerOrder, 'order_id'),
+    (OrderStatusChange, ArchivedOrderStatusChange, 'seller_order__order_id'),
+]
+
+
+def horizon(days=ARCHIVE_AFTER_DAYS, today=None):
+    """Orders placed before this datetime can be archived once closed."""
+    today = today or timezone.localdate()
+    return timezone.make_aware(datetime.datetime.combine(today - datetime.timedelta(days=days), datetime.time.min))
+
+
+def archivable(before):
+    return Order.objects.filter(created_at__lt=before, status__in=CLOSED_STATUSES)
+
+
+def archive_batch(order_ids):
+    """Copy the orders `order_ids` and everything hanging off them to the archive, then delete them."""
+    with transaction.atomic():
+        for model, archived_model, order_lookup in ARCHIVED_MODELS:
+            columns = [field.attname for field in model._meta.concrete_fields]
+            rows = model.objects.filter(**{f'{order_lookup}__in': order_ids}).values(*columns)
+            archived_model.objects.bulk_create([archived_model(**row) for row in rows])
+        # Cascades to the rows copied above and to the orders' idempotency keys
+        Order.objects.filter(id__in=order_ids).delete()
+
+
+def archive_orders(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive every closed order placed before `before`. Returns how many were moved."""
+    if before > seller_stats.recent_cutoff():
+        # The sellers' rolling-window stats are summed from live SellerOrder rows
+        raise ValueError(f"Orders newer than {seller_stats.RECENT_DAYS} days can't be archived.")
+    moved = 0
+    while True:
+        order_ids = list(archivable(before).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not order_ids:
+            return moved
+        archive_batch(order_ids)
+        moved += len(order_ids)
+
+
+def customer_orders(customer_id, archived=False):
+    """The customer's live (or archived) orders, with their items and products prefetched."""
+    order_model, item_model = (ArchivedOrder, ArchivedOrderItem) if archived else (Order, OrderItem)
+    return order_model.objects.filter(customer_id=customer_id).prefetch_related(
+        Prefetch('items', queryset=item_model.objects.select_related('product').order_by('id')),
+    )
+
+
+def customer_order(customer_id, order_id):
+    """The customer's order with its payment, items, products and sellers, live or archived; None if neither."""
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        order = order_model.objects.select_related('payment').prefetch_related(
+            Prefetch('items', queryset=item_model.objects.select_related('product__seller').order_by('id')),
+        ).filter(id=order_id, customer_id=customer_id).first()
+        if order is not None:
+            return order
+    return None
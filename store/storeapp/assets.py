@@ -0,0 +1,128 @@
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+
+# --- Static asset bundle ---
+#
+# The pages used to pull the Tailwind Play CDN (which compiles CSS in the
+# browser), Google Fonts and Font Awesome from third-party hosts on every
+# visit. Instead, build_assets compiles assets/app.css with the Tailwind CLI
+# into one minified static/css/app.css holding only the utilities the
+# templates use, and cuts the Font Awesome solid font down to the icons the
+# templates name, with a matching static/css/icons.css. The built files are
+# committed, so deploying needs no Node, no network and none of the build
+# tools; collectstatic gives them content-hashed names.
+#
+# Build tools: pip install tailwindcss-bin fontawesomefree fonttools brotli
+
+ASSETS_DIR = Path(settings.BASE_DIR) / 'assets'
+TEMPLATES_DIR = Path(settings.BASE_DIR) / 'templates'
+STATIC_DIR = Path(settings.BASE_DIR) / 'static'
+
+CSS_SOURCE = ASSETS_DIR / 'app.css'
+CSS_BUNDLE = STATIC_DIR / 'css' / 'app.css'
+ICON_CSS = STATIC_DIR / 'css' / 'icons.css'
+ICON_FONT = STATIC_DIR / 'fonts' / 'fa-solid.woff2'
+
+ICON_CLASS = re.compile(r'\bfa-[a-z0-9-]+')
+ICON_FAMILY = 'Font Awesome 6 Free'
+
+# Font Awesome classes that change how an icon is drawn rather than naming one
+ICON_MODIFIERS = {
+    'fa-lg': 'font-size:1.25em;line-height:.05em;vertical-align:-.075em',
+    'fa-fw': 'text-align:center;width:1.25em',
+}
+
+ICON_BASE = (
+    '.fa,.fas,.fa-solid{-moz-osx-font-smoothing:grayscale;-webkit-font-smoothing:antialiased;'
+    'display:inline-block;font-style:normal;font-variant:normal;line-height:1;text-rendering:auto;'
+    f'font-family:"{ICON_FAMILY}";font-weight:900}}'
+)
+
+
+class AssetBuildError(Exception):
+    """A build tool is missing or failed."""
+
+
+def build_css(tailwind='tailwindcss'):
+    """Compile CSS_SOURCE into the minified CSS_BUNDLE; returns its size in bytes."""
+    executable = shutil.which(tailwind)
+    if executable is None:
+        raise AssetBuildError(f'{tailwind} was not found; pip install tailwindcss-bin.')
+    CSS_BUNDLE.parent.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(
+        [executable, '--input', str(CSS_SOURCE), '--output', str(CSS_BUNDLE), '--minify'],
+        capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise AssetBuildError(f'Tailwind failed:\n{result.stderr}')
+    return CSS_BUNDLE.stat().st_size
+
+
+def used_icons():
+    """The Font Awesome icon classes that appear in the templates, e.g. ['fa-bars', ...]."""
+    names = set()
+    for path in sorted(TEMPLATES_DIR.rglob('*.html')):
+        names.update(ICON_CLASS.findall(path.read_text(encoding='utf-8')))
+    return sorted(names - ICON_MODIFIERS.keys())
+
+
+def _font_awesome():
+    try:
+        import fontawesomefree
+    except ImportError:
+        raise AssetBuildError('fontawesomefree is not installed; pip install fontawesomefree.')
+    return Path(fontawesomefree.__file__).parent / 'static' / 'fontawesomefree'
+
+
+def icon_codepoints(classes, metadata):
+    """{icon class: code point} for `classes`, looking names and their old aliases up in `metadata`."""
+    codepoints = {}
+    for name, icon in metadata.items():
+        if 'solid' not in icon.get('free', []):
+            continue
+        for alias in [name, *icon.get('aliases', {}).get('names', [])]:
+            codepoints[f'fa-{alias}'] = int(icon['unicode'], 16)
+    unknown = [icon for icon in classes if icon not in codepoints]
+    if unknown:
+        raise AssetBuildError(f'Not a free solid Font Awesome icon: {", ".join(unknown)}.')
+    return {icon: codepoints[icon] for icon in classes}
+
+
+def build_icons():
+    """Write ICON_FONT with just the used icons and the ICON_CSS that draws them; returns the icon count."""
+    try:
+        from fontTools import subset
+    except ImportError:
+        raise AssetBuildError('fontTools is not installed; pip install fonttools brotli.')
+    source = _font_awesome()
+    with open(source / 'metadata' / 'icons.json', encoding='utf-8') as metadata:
+        codepoints = icon_codepoints(used_icons(), json.load(metadata))
+
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = []
+    options.name_IDs = []
+    options.notdef_outline = True
+    font = subset.load_font(str(source / 'webfonts' / 'fa-solid-900.woff2'), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=set(codepoints.values()))
+    subsetter.subset(font)
+    ICON_FONT.parent.mkdir(parents=True, exist_ok=True)
+    subset.save_font(font, str(ICON_FONT), options)
+
+    font_url = Path('..', ICON_FONT.relative_to(STATIC_DIR)).as_posix()
+    rules = [
+        f'@font-face{{font-family:"{ICON_FAMILY}";font-style:normal;font-weight:900;font-display:block;'
+        f'src:url({font_url}) format("woff2")}}',
+        ICON_BASE,
+        *[f'.{name}{{{style}}}' for name, style in ICON_MODIFIERS.items()],
+        *[f'.{name}::before{{content:"\\{codepoint:x}"}}' for name, codepoint in codepoints.items()],
+    ]
+    ICON_CSS.parent.mkdir(parents=True, exist_ok=True)
+    ICON_CSS.write_text('\n'.join(rules) + '\n', encoding='utf-8')
+    return len(codepoints)
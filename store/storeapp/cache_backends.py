@@ -0,0 +1,23 @@
+import itertools
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+# --- Shared file cache ---
+#
+# Django's FileBasedCache lists its whole folder on every set() to see
+# whether MAX_ENTRIES has been reached: about 30 ms per write at 10,000
+# entries, against 0.02 ms for a read. This one only counts every
+# CULL_EVERY writes (per process), so the folder can overshoot MAX_ENTRIES
+# by up to CULL_EVERY entries per worker before the usual random cull
+# (CULL_FREQUENCY) brings it back down.
+
+
+class FileCache(FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_every = int(params.get('OPTIONS', {}).get('CULL_EVERY', 100))
+        self._writes = itertools.count(1)
+
+    def _cull(self):
+        if next(self._writes) % self._cull_every == 0:
+            super()._cull()
@@ -0,0 +1,36 @@
+import time
+
+from django.core.cache import cache
+
+# --- Versioned cache namespaces ---
+#
+# Cached values embed the current version of their namespace in the key.
+# Bumping the version makes every older entry unreachable at once, so
+# writers never need to know which keys readers have built.
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Start from the clock so an evicted counter never reuses old keys
+        cache.add(_version_key(namespace), time.time_ns(), None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace):
+    # A fresh clock reading rather than incr(): most backends (the file cache
+    # among them) incr with a separate get and set, so two bumps at once could
+    # both write the same v+1 and one invalidation would be lost. Whichever of
+    # two readings lands, it differs from every version before either bump.
+    version = time.time_ns()
+    cache.set(_version_key(namespace), version, None)
+    return version
+
+
+def versioned_key(namespace, *parts):
+    return ':'.join([namespace, str(get_version(namespace)), *map(str, parts)])
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .caching import bump_version, get_version, versioned_key
+from .facets import CATALOG_NAMESPACE
+from .models import CartItem
+
+# --- Cart summary for the header badge ---
+#
+# Cached per customer under a version that the cart views bump on every
+# change. The catalog version is part of the key as well, so a price edit
+# refreshes the cached subtotal.
+
+CART_SUMMARY_TIMEOUT = 60 * 60
+
+
+def empty_cart_summary():
+    # A new dict each time: callers may modify what they are given
+    return {'item_count': 0, 'product_ids': [], 'subtotal': Decimal('0.00')}
+
+
+def _namespace(customer_id):
+    return f'cart:{customer_id}'
+
+
+def invalidate_cart(customer_id):
+    bump_version(_namespace(customer_id))
+
+
+def get_cart_summary(customer_id):
+    """Item count, product ids and subtotal of a customer's cart."""
+    if not customer_id:
+        return empty_cart_summary()
+    key = versioned_key(_namespace(customer_id), get_version(CATALOG_NAMESPACE), 'summary')
+    summary = cache.get(key)
+    if summary is None:
+        rows = CartItem.objects.filter(customer_id=customer_id).values_list(
+            'product_id', 'quantity', 'product__price'
+        )
+        summary = empty_cart_summary()
+        for product_id, quantity, price in rows:
+            summary['item_count'] += quantity
+            summary['product_ids'].append(product_id)
+            summary['subtotal'] += quantity * price
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
@@ -0,0 +1,107 @@
+import csv
+import heapq
+from operator import itemgetter
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from . import rollups
+from .models import ArchivedOrderItem, OrderItem
+
+# --- Streaming CSV exports ---
+#
+# Rows are written one at a time into a StreamingHttpResponse while the
+# queryset is read with .iterator(), so neither the query results nor the
+# CSV body are ever held in memory whole, whatever the date range.
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Leading characters that make spreadsheet apps treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose write() just hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _order_item_rows(start, end):
+    day_start, day_end = rollups.day_bounds(start)[0], rollups.day_bounds(end)[1]
+    # Live and archived items, each read in order and merged by order date
+    sources = [
+        model.objects
+        .filter(order__created_at__gte=day_start, order__created_at__lt=day_end)
+        .order_by('order__created_at', 'id')
+        .values_list(
+            'order_id', 'order__created_at', 'order__customer__name', 'product_id',
+            'product__product_name', 'product__seller__name', 'quantity', 'price', 'cost_price',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for model in (OrderItem, ArchivedOrderItem)
+    ]
+    for order_id, created_at, customer, product_id, product, seller, quantity, price, cost in heapq.merge(
+        *sources, key=itemgetter(1)
+    ):
+        yield [
+            order_id, timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M:%S'), customer, product_id,
+            product, seller, quantity, price, cost, price * quantity, (price - cost) * quantity,
+        ]
+
+
+def _product_rows(start, end):
+    for row in rollups.product_sales(start, end).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            row['product_id'], row['product__product_name'], row['product__seller__name'],
+            row['total_quantity_sold'], row['total_revenue'], row['total_cost'], row['total_profit'],
+        ]
+
+
+def _seller_rows(start, end):
+    for row in rollups.seller_sales(start, end).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            row['seller_id'], row['seller__name'],
+            row['total_quantity_sold'], row['total_revenue'], row['total_cost'], row['total_profit'],
+        ]
+
+
+# export name -> (header, row generator)
+EXPORTS = {
+    'order-items': (
+        ['Order ID', 'Order Date', 'Customer', 'Product ID', 'Product', 'Seller',
+         'Quantity', 'Unit Price', 'Unit Cost', 'Line Total', 'Line Profit'],
+        _order_item_rows,
+    ),
+    'products': (
+        ['Product ID', 'Product', 'Seller', 'Units Sold', 'Revenue', 'Cost', 'Profit'],
+        _product_rows,
+    ),
+    'sellers': (
+        ['Seller ID', 'Seller', 'Units Sold', 'Revenue', 'Cost', 'Profit'],
+        _seller_rows,
+    ),
+}
+
+
+def stream_csv(header, rows):
+    """Yield CSV lines for `header` and then every row of `rows`."""
+    writer = csv.writer(Echo())
+    # The BOM lets Excel pick up UTF-8 (₹, Malayalam names) when the file is opened directly
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def export_response(name, start, end):
+    """StreamingHttpResponse with the `name` export for the dates [start, end]."""
+    header, rows = EXPORTS[name]
+    response = StreamingHttpResponse(stream_csv(header, rows(start, end)), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{name}_{start.isoformat()}_{end.isoformat()}.csv"'
+    return response
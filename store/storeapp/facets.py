@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField
+from django.db.models.functions import Cast
+
+from .caching import bump_version, versioned_key
+from .models import Product
+
+# --- Catalog facets (category counts and price histogram) ---
+#
+# The whole-catalog facets are cached under the "catalog" version, which is
+# bumped whenever a product or a seller's approval changes (see signals.py).
+# Facets for a search are computed from the matching rows only.
+
+CATALOG_NAMESPACE = 'catalog'
+FACET_CACHE_TIMEOUT = 60 * 60
+
+# Must line up with the max_price slider in products.html
+PRICE_BUCKET_WIDTH = 250
+PRICE_SLIDER_MAX = 2000
+
+
+def invalidate_catalog():
+    bump_version(CATALOG_NAMESPACE)
+
+
+def compute_facets(queryset):
+    """Category counts and a price histogram for a Product queryset."""
+    queryset = queryset.order_by()
+    categories = [
+        {'name': row['category'], 'count': row['count']}
+        for row in queryset.values('category').annotate(count=Count('id')).order_by('category')
+    ]
+
+    bucket_counts = dict(
+        queryset.annotate(bucket=Cast(F('price') / PRICE_BUCKET_WIDTH, IntegerField()))
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .values_list('bucket', 'count')
+    )
+    last_bucket = PRICE_SLIDER_MAX // PRICE_BUCKET_WIDTH - 1
+    histogram = []
+    for bucket in range(last_bucket + 1):
+        count = bucket_counts.get(bucket, 0)
+        if bucket == last_bucket:
+            # Everything above the slider range lands in the top bucket
+            count += sum(n for b, n in bucket_counts.items() if b > last_bucket)
+        histogram.append({
+            'min': bucket * PRICE_BUCKET_WIDTH,
+            'max': (bucket + 1) * PRICE_BUCKET_WIDTH,
+            'count': count,
+        })
+    peak = max(bucket['count'] for bucket in histogram) or 1
+    for bucket in histogram:
+        bucket['percent'] = round(100 * bucket['count'] / peak)
+    return {'categories': categories, 'price_histogram': histogram}
+
+
+def catalog_facets():
+    """Facets for every visible product, cached until the catalog changes."""
+    key = versioned_key(CATALOG_NAMESPACE, 'facets')
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(Product.objects.filter(is_visible=True))
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,29 @@
+from . import images
+from .models import CommunityPost
+from .pagination import KeysetPaginator
+
+# --- Community feed ---
+#
+# Posts are listed newest first, FEED_PAGE_SIZE at a time, with a keyset
+# cursor over (created_at, id) that community_post_feed_idx serves without a
+# sort. The page renders the first batch; the rest are fetched from the
+# community_feed fragment endpoint as the reader scrolls. Each post's HTML is
+# cached with {% cache %} in community_posts.html under the post id, its
+# updated_at and whether its resized images exist yet. An edit or the
+# variants being made changes the key, so no worker can serve a stale
+# fragment and nothing has to be deleted; the old ones age out after
+# POST_FRAGMENT_TIMEOUT. Image readiness for the page is read with one
+# cache lookup (see images.ready_variants).
+
+FEED_PAGE_SIZE = 10
+FEED_ORDERING = ('-created_at', '-id')
+POST_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+
+def feed_page(cursor=None):
+    """The KeysetPage of posts after `cursor` (the newest posts without one)."""
+    page = KeysetPaginator(CommunityPost.objects.all(), FEED_PAGE_SIZE, FEED_ORDERING).get_page(cursor)
+    ready = images.ready_variants(post.image.name for post in page if post.image)
+    for post in page:
+        post.images_ready = bool(post.image) and post.image.name in ready
+    return page
@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups, seller_stats
+from .models import Order, OrderItem, OrderStatus, OrderStatusChange, SellerOrder
+from .stock import increment_stock
+
+# --- Fulfilment workflow ---
+#
+# Each seller moves their own SellerOrder rows through the states below.
+# A transition is applied to any number of rows with one UPDATE, logged
+# with one INSERT, and then every affected Order gets a status derived from
+# its seller orders: as far along as its slowest seller, or cancelled once
+# every seller has cancelled. Cancelling puts the seller's lines back in
+# stock and takes them out of the sales rollups and seller stats, in the
+# same transaction.
+
+TRANSITIONS = {
+    OrderStatus.PLACED: {OrderStatus.CONFIRMED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+# Progress order of the non-cancelled states
+FLOW = [OrderStatus.PLACED, OrderStatus.CONFIRMED, OrderStatus.SHIPPED, OrderStatus.DELIVERED]
+
+
+def allowed_sources(to_status):
+    """States a seller order may be moved to `to_status` from."""
+    return [status for status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+def next_statuses(status):
+    """States a seller order in `status` may move to, in workflow order."""
+    return [target for target in [*FLOW, OrderStatus.CANCELLED] if target in TRANSITIONS[status]]
+
+
+def order_status(seller_statuses):
+    """Overall status of an order whose seller orders are in `seller_statuses`."""
+    active = [status for status in seller_statuses if status != OrderStatus.CANCELLED]
+    if not active:
+        return OrderStatus.CANCELLED
+    return min(active, key=FLOW.index)
+
+
+def sync_order_status(order_ids):
+    """Recompute Order.status for `order_ids`: one read plus one UPDATE per resulting status."""
+    statuses = {}
+    for order_id, status in SellerOrder.objects.filter(order_id__in=order_ids).values_list('order_id', 'status'):
+        statuses.setdefault(order_id, []).append(status)
+
+    by_status = {}
+    for order_id, seller_statuses in statuses.items():
+        by_status.setdefault(order_status(seller_statuses), []).append(order_id)
+    for status, ids in by_status.items():
+        Order.objects.filter(id__in=ids).exclude(status=status).update(status=status)
+
+
+def transition(seller_orders, to_status, changed_by):
+    """Move every row of the `seller_orders` queryset that is allowed to go to `to_status`.
+
+    Rows in any other state are left alone. `changed_by` is recorded in the
+    log, e.g. "seller:12" or "admin". Returns the number of rows moved.
+    """
+    sources = allowed_sources(to_status)
+    with transaction.atomic():
+        rows = list(
+            seller_orders.filter(status__in=sources)
+            .select_for_update()
+            .values_list('id', 'order_id', 'status')
+        )
+        if not rows:
+            return 0
+        SellerOrder.objects.filter(id__in=[pk for pk, _, _ in rows], status__in=sources).update(status=to_status)
+        OrderStatusChange.objects.bulk_create([
+            OrderStatusChange(seller_order_id=pk, from_status=status, to_status=to_status, changed_by=changed_by)
+            for pk, _, status in rows
+        ])
+        if to_status == OrderStatus.CANCELLED:
+            release_cancelled([pk for pk, _, _ in rows])
+        sync_order_status({order_id for _, order_id, _ in rows})
+    return len(rows)
+
+
+def release_cancelled(seller_order_ids):
+    """Restock the lines of just-cancelled seller orders and take them out of the sales figures."""
+    shares = list(SellerOrder.objects.filter(id__in=seller_order_ids).select_related('order'))
+    placed_at = {(share.order_id, share.seller_id): share.order.created_at for share in shares}
+    items = OrderItem.objects.filter(order_id__in={share.order_id for share in shares}).values_list(
+        'order_id', 'product_id', 'product__seller_id', 'quantity', 'price', 'cost_price',
+    )
+
+    restock, lines_by_day = {}, {}
+    for order_id, product_id, seller_id, quantity, price, cost_price in items:
+        if (order_id, seller_id) not in placed_at:
+            continue  # another seller's line in the same order
+        restock[product_id] = restock.get(product_id, 0) + quantity
+        day = timezone.localdate(placed_at[order_id, seller_id])
+        lines_by_day.setdefault(day, []).append((product_id, seller_id, quantity, price, cost_price))
+
+    increment_stock(restock)
+    rollups.record_cancellation(lines_by_day)
+    seller_stats.record_cancellation(shares)
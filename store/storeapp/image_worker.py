@@ -0,0 +1,45 @@
+import io
+
+from PIL import Image, ImageOps
+
+# --- Image variant worker ---
+#
+# The part of the responsive image variants that runs in the worker
+# processes. It only imports Pillow, never Django, so a worker started
+# with the "spawn" method loads no settings, models or database
+# connections; it is handed the original's bytes and returns the encoded
+# variants for images.py to save.
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {
+    # extension -> (Pillow format, save options)
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def render_variants(data):
+    """{(width, extension): encoded bytes} for the image in `data`.
+
+    Images narrower than a width are re-encoded at their own size, never
+    enlarged.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        variants = {}
+        # Largest first, each resized from the one before, which is cheaper than starting from the original
+        for width in sorted(VARIANT_WIDTHS, reverse=True):
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for extension, (image_format, options) in VARIANT_FORMATS.items():
+                frame = image
+                if has_alpha and image_format == 'JPEG':
+                    frame = Image.new('RGB', image.size, 'white')
+                    frame.paste(image, mask=image.getchannel('A'))
+                buffer = io.BytesIO()
+                frame.save(buffer, image_format, **options)
+                variants[width, extension] = buffer.getvalue()
+    return variants
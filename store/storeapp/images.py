@@ -0,0 +1,125 @@
+import hashlib
+import multiprocessing
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .image_worker import VARIANT_FORMATS, VARIANT_WIDTHS, render_variants
+from .models import CommunityPost, Customer, PendingVariant, Product, Seller
+
+# --- Responsive image variants ---
+#
+# Every uploaded photo gets resized copies at a few fixed widths, as WebP and
+# as JPEG for browsers without WebP, stored next to the original under a
+# "variants/" folder: product_photos/x.png -> product_photos/variants/x.png.320w.webp.
+# Saving a picture only queues its name as a PendingVariant, in the same
+# transaction as the row. The make_image_variants command, run every minute
+# (see README), renders the queue in a small process pool outside the web
+# workers, which never start processes of their own. The pool is started
+# with "spawn" and its workers only import image_worker.py, so they never
+# inherit the command's database connection; they get bytes, and the
+# results are saved back through the storage by the command. The
+# {% responsive_image %} tag builds srcset from the same names, falling back
+# to the original until the variants exist.
+#
+# Whether a file's variants exist is kept in the cache, so pages don't hit
+# the storage for every picture they draw. Media names are content
+# addressed, so a name never changes what it points at: "ready" is cached
+# for good, and set as soon as the variants are saved; "not yet" is
+# rechecked after VARIANT_CHECK_TIMEOUT.
+
+VARIANT_DIR = 'variants'
+VARIANT_SUFFIX = re.compile(r'\.\d+w\.[a-z]+$')
+VARIANT_WORKERS = 2
+VARIANT_CHECK_TIMEOUT = 60
+
+# (model, image field) for every uploaded picture, counted and cleaned up by media_refs and media_gc
+IMAGE_FIELDS = [
+    (Product, 'photo'),
+    (Customer, 'photo'),
+    (CommunityPost, 'image'),
+    (Seller, 'passbook'),
+]
+# The ones shown on the site and so given variants; passbooks are only for the admins' eyes
+VARIANT_FIELDS = [(model, field) for model, field in IMAGE_FIELDS if (model, field) != (Seller, 'passbook')]
+
+def variant_name(name, width, extension):
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, VARIANT_DIR, f'{filename}.{width}w.{extension}')
+
+
+def variant_names(name):
+    """Every variant of `name`, in the order they are written."""
+    return [
+        variant_name(name, width, extension)
+        for width in VARIANT_WIDTHS for extension in VARIANT_FORMATS
+    ]
+
+
+def is_variant(name):
+    return posixpath.basename(posixpath.dirname(name)) == VARIANT_DIR
+
+
+def original_name(name):
+    """The original a variant file was made from."""
+    variants_dir, filename = posixpath.split(name)
+    return posixpath.join(posixpath.dirname(variants_dir), VARIANT_SUFFIX.sub('', filename))
+
+
+def _ready_key(name):
+    return 'variants:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def ready_variants(names):
+    """The subset of `names` whose variants have all been stored."""
+    names = set(names)
+    known = cache.get_many([_ready_key(name) for name in names])
+    ready = {name for name in names if known.get(_ready_key(name))}
+    unknown = {name for name in names if _ready_key(name) not in known}
+    if unknown:
+        # The last variant is written last, so its presence means the set is complete
+        found = {name for name in unknown if default_storage.exists(variant_names(name)[-1])}
+        cache.set_many({_ready_key(name): True for name in found}, None)
+        cache.set_many({_ready_key(name): False for name in unknown - found}, VARIANT_CHECK_TIMEOUT)
+        ready |= found
+    return ready
+
+
+def has_variants(name):
+    return name in ready_variants([name])
+
+
+def forget_variants(names):
+    """The variants of `names` were deleted."""
+    cache.delete_many([_ready_key(name) for name in names])
+
+
+def store_variants(name, variants):
+    """Save the output of render_variants() for the original `name`."""
+    for width in VARIANT_WIDTHS:
+        for extension in VARIANT_FORMATS:
+            target = variant_name(name, width, extension)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(variants[width, extension]))
+    cache.set(_ready_key(name), True, None)
+
+
+def make_variants(name):
+    """Render and store the variants of `name` in this process."""
+    with default_storage.open(name, 'rb') as source:
+        store_variants(name, render_variants(source.read()))
+
+
+def process_pool(workers=VARIANT_WORKERS):
+    """A pool for render_variants() whose workers start afresh rather than as forks of this process."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def schedule_variants(name):
+    """Queue `name` for make_image_variants; it is committed or rolled back with the caller's transaction."""
+    PendingVariant.objects.bulk_create([PendingVariant(name=name)], ignore_conflicts=True)
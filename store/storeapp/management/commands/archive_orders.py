@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from storeapp import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS, with their items, "
+        "payments and seller orders, into the archive tables. Run it nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=archive.ARCHIVE_AFTER_DAYS,
+            help="Archive closed orders placed more than this many days ago (default %(default)s).",
+        )
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Count the orders without moving them.")
+
+    def handle(self, *args, **options):
+        before = archive.horizon(options['days'])
+        if options['dry_run']:
+            count = archive.archivable(before).count()
+            self.stdout.write(f"{count} closed order(s) placed before {before:%Y-%m-%d} would be archived.")
+            return
+        try:
+            moved = archive.archive_orders(before, options['batch_size'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} order(s) placed before {before:%Y-%m-%d}."))
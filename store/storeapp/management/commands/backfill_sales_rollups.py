@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from storeapp import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups from order items, one day per transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        days = rollups.order_days(options['start'], options['end'])
+        for day in days:
+            with transaction.atomic():
+                rollups.refresh_day(day)
+        rollups.invalidate_sales()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups for {len(days)} day(s)."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from storeapp import assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild static/css/app.css from assets/app.css and the classes used in the templates, and the "
+        "Font Awesome subset (static/fonts/fa-solid.woff2 and static/css/icons.css). Run it after "
+        "changing template classes or icons and commit the output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailwind', default='tailwindcss', help="Tailwind CLI to run (default %(default)s).")
+        parser.add_argument('--skip-icons', action='store_true', help="Only rebuild the CSS bundle.")
+
+    def handle(self, *args, **options):
+        try:
+            size = assets.build_css(options['tailwind'])
+            self.stdout.write(f"{assets.CSS_BUNDLE.relative_to(assets.STATIC_DIR)}: {size / 1024:.1f} KB")
+            if not options['skip_icons']:
+                count = assets.build_icons()
+                self.stdout.write(
+                    f"{assets.ICON_FONT.relative_to(assets.STATIC_DIR)}: {count} icon(s), "
+                    f"{assets.ICON_FONT.stat().st_size / 1024:.1f} KB"
+                )
+        except assets.AssetBuildError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS("Assets built."))
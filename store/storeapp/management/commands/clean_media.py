@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from storeapp import media_gc
+
+
+class Command(BaseCommand):
+    help = (
+        "Find media files that no product, customer, seller or community post points at any more, "
+        "with their resized variants, and delete them or move them to a quarantine folder."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="List the orphans without touching them.")
+        parser.add_argument('--quarantine', metavar='DIR', help="Move orphans under DIR instead of deleting them.")
+        parser.add_argument(
+            '--min-age', type=float, default=media_gc.GC_MIN_AGE_HOURS, metavar='HOURS',
+            help="Leave files younger than this alone (default %(default)s).",
+        )
+        parser.add_argument('--batch-size', type=int, default=media_gc.GC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        orphans = media_gc.find_orphans(options['batch_size'], options['min_age'])
+
+        def report(orphans):
+            for name, path, size in orphans:
+                self.stdout.write(f"{name} ({size / 1024:.0f} KB)")
+                yield name, path, size
+
+        if options['dry_run']:
+            files = total = 0
+            for _, _, size in report(orphans):
+                files, total = files + 1, total + size
+            action = "would be removed"
+        else:
+            files, total = media_gc.remove(report(orphans), options['quarantine'])
+            action = f"moved to {options['quarantine']}" if options['quarantine'] else "deleted"
+
+        self.stdout.write(self.style.SUCCESS(f"{files} orphaned file(s), {total / (1024 * 1024):.1f} MB, {action}."))
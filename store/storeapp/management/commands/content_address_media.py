@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Value, When
+
+from storeapp import images, media_refs
+from storeapp.storage import is_content_addressed, media_storage
+
+UPDATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy existing media to content-addressed names, point every row at the new name and rebuild the "
+        "reference counts. Identical uploads collapse to one file. The old files are left where they are "
+        "until the media clean-up removes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would move without copying or updating.")
+
+    def handle(self, *args, **options):
+        storage = media_storage()
+        dry_run = options['dry_run']
+        renamed = {}
+        old_bytes = missing = 0
+
+        for model, field in images.IMAGE_FIELDS:
+            names = (
+                model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .order_by().values_list(field, flat=True).distinct()
+            )
+            for name in names.iterator():
+                if name in renamed or is_content_addressed(name):
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"{name}: file is missing, left as it is")
+                    continue
+                with storage.open(name, 'rb') as content:
+                    renamed[name] = storage.hashed_name(name, content) if dry_run else storage.save(name, content)
+                old_bytes += storage.size(name)
+
+        unique = set(renamed.values())
+        new_bytes = sum(storage.size(name) for name in unique) if not dry_run else None
+        if not dry_run:
+            self.repoint(renamed)
+            media_refs.recount()
+
+        for old, new in sorted(renamed.items()):
+            self.stdout.write(f"{old} -> {new}")
+        summary = f"{len(renamed)} file(s) {'would move' if dry_run else 'moved'} to {len(unique)} content-addressed name(s)"
+        if new_bytes is not None:
+            summary += f"; {(old_bytes - new_bytes) / (1024 * 1024):.1f} MB saved once the old files are cleaned up"
+        if missing:
+            summary += f"; {missing} missing"
+        self.stdout.write(self.style.SUCCESS(summary + "."))
+        if renamed and not dry_run:
+            self.stdout.write("Run make_image_variants --all to build the resized variants under the new names.")
+
+    def repoint(self, renamed):
+        """Rewrite the image fields from old to new names, one CASE UPDATE per batch of names."""
+        old_names = list(renamed)
+        with transaction.atomic():
+            for model, field in images.IMAGE_FIELDS:
+                for start in range(0, len(old_names), UPDATE_BATCH_SIZE):
+                    batch = old_names[start:start + UPDATE_BATCH_SIZE]
+                    model.objects.filter(**{f'{field}__in': batch}).update(**{
+                        field: Case(*[When(**{field: old}, then=Value(renamed[old])) for old in batch]),
+                    })
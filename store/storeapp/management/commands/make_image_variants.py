@@ -0,0 +1,76 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from storeapp import images
+from storeapp.models import PendingVariant
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the resized WebP/JPEG variants for the images queued since the last run; schedule it every "
+        "minute. With --all, go through every stored product, customer and community post image that "
+        "doesn't have them yet. Resizing runs in a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=images.VARIANT_WORKERS)
+        parser.add_argument('--all', action='store_true', help="Check every stored image, not just the queue.")
+        parser.add_argument('--force', action='store_true', help="Remake variants that already exist.")
+
+    def names(self, everything):
+        if not everything:
+            yield from PendingVariant.objects.order_by('id').values_list('name', flat=True).iterator()
+            return
+        seen = set()
+        for model, field in images.VARIANT_FIELDS:
+            for name in model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(
+                field, flat=True
+            ).distinct().iterator():
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+    def handle(self, *args, **options):
+        made = skipped = missing = failed = 0
+        pending = {}
+        finished = []
+        # Keep a few images per worker in flight so memory stays bounded however many there are
+        window = options['workers'] * 4
+
+        def collect(done):
+            nonlocal made, failed
+            for future in done:
+                name = pending.pop(future)
+                finished.append(name)
+                try:
+                    images.store_variants(name, future.result())
+                    made += 1
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+
+        with images.process_pool(options['workers']) as executor:
+            for name in self.names(options['all']):
+                if not options['force'] and images.has_variants(name):
+                    skipped += 1
+                    finished.append(name)
+                    continue
+                if not default_storage.exists(name):
+                    missing += 1
+                    finished.append(name)
+                    self.stderr.write(f"{name}: file is missing")
+                    continue
+                with default_storage.open(name, 'rb') as source:
+                    pending[executor.submit(images.render_variants, source.read())] = name
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(wait(pending).done)
+
+        # Failures leave the queue too: a broken file won't mend itself, and --all --force retries it
+        PendingVariant.objects.filter(name__in=finished).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Made variants for {made} image(s); {skipped} already had them, {missing} missing, {failed} failed."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from storeapp import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the product table."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write("Full-text search is only available on SQLite; nothing to do.")
+            return
+        search.rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS("Product search index rebuilt."))
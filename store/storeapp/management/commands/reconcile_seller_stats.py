@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from storeapp import seller_stats
+from storeapp.models import Seller
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild seller KPI counters from orders, products and feedback, a batch of sellers at a time, "
+        "and report any values that had drifted. Run it nightly so the rolling window rolls over too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without rewriting anything.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = drifted_sellers = 0
+        last_id = 0
+        while True:
+            seller_ids = list(
+                Seller.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not seller_ids:
+                break
+            with transaction.atomic():
+                drift = seller_stats.reconcile(seller_ids, fix=not options['dry_run'])
+            for seller_id, field, stored, actual in drift:
+                self.stdout.write(f"seller {seller_id}: {field} was {stored}, should be {actual}")
+            checked += len(seller_ids)
+            drifted_sellers += len({seller_id for seller_id, *_ in drift})
+            last_id = seller_ids[-1]
+
+        summary = f"Checked {checked} seller(s); {drifted_sellers} had drifted"
+        if drifted_sellers and not options['dry_run']:
+            summary += " and were rebuilt"
+        self.stdout.write(self.style.SUCCESS(summary + "."))
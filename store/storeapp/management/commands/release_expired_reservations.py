@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from storeapp import reservations
+
+
+class Command(BaseCommand):
+    help = "Return stock held by expired checkout reservations. Run it every few minutes from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=reservations.RELEASE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        released = reservations.release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservation(s)."))
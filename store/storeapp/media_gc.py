@@ -0,0 +1,112 @@
+import os
+import posixpath
+import shutil
+import time
+
+from .images import IMAGE_FIELDS, VARIANT_FIELDS, forget_variants, is_variant, original_name
+from .media_refs import references
+from .models import StoredFile
+from .storage import media_storage
+
+# --- Orphaned media clean-up ---
+#
+# Deleting a row or replacing its picture never removes the old file. The
+# sweeper walks the upload folders of every image field in sorted order and
+# checks each batch of paths against the rows with one IN query per field,
+# so neither the file list nor the set of referenced names is held whole.
+# A variant belongs to its original and goes when the original does, or
+# when only fields without variants (passbooks) still point at it. Files
+# younger than the grace period are skipped: an upload is written to disk
+# before the row that points at it is committed.
+
+GC_BATCH_SIZE = 500
+GC_MIN_AGE_HOURS = 24
+
+
+def upload_dirs():
+    """The distinct upload_to folders of the image fields."""
+    return sorted({
+        model._meta.get_field(field).upload_to.strip('/') for model, field in IMAGE_FIELDS
+    })
+
+
+def walk(directory):
+    """Yield (name, full path) for every file under `directory` of the media storage, in sorted order."""
+    storage = media_storage()
+    root = storage.path(directory)
+    for current, dirs, files in os.walk(root):
+        dirs.sort()
+        relative = os.path.relpath(current, storage.location).replace(os.sep, '/')
+        for filename in sorted(files):
+            yield posixpath.join(relative, filename), os.path.join(current, filename)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def find_orphans(batch_size=GC_BATCH_SIZE, min_age_hours=GC_MIN_AGE_HOURS, now=None):
+    """Yield (name, full path, size) for every media file no row references."""
+    cutoff = (now or time.time()) - min_age_hours * 3600
+    for directory in upload_dirs():
+        for batch in _batches(walk(directory), batch_size):
+            originals = {name for name, _ in batch if not is_variant(name)}
+            owners = {name: original_name(name) for name, _ in batch if is_variant(name)}
+            referenced = references(originals)
+            shown = references(set(owners.values()), VARIANT_FIELDS)
+            for name, path in batch:
+                if (owners[name] in shown) if name in owners else (name in referenced):
+                    continue
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                yield name, path, stat.st_size
+
+
+def remove(orphans, quarantine=None):
+    """Delete the (name, path, size) `orphans`, or move them under the `quarantine` folder.
+
+    Returns the number of files and bytes removed. StoredFile rows of
+    removed originals are dropped, and so are folders left empty.
+    """
+    files = total = 0
+    emptied = set()
+    for batch in _batches(orphans, GC_BATCH_SIZE):
+        for name, path, size in batch:
+            if quarantine:
+                target = os.path.join(quarantine, *name.split('/'))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            else:
+                os.remove(path)
+            files, total = files + 1, total + size
+            emptied.add(posixpath.dirname(name))
+        StoredFile.objects.filter(name__in=[name for name, _, _ in batch if not is_variant(name)]).delete()
+        forget_variants({original_name(name) for name, _, _ in batch if is_variant(name)})
+    _prune(emptied)
+    return files, total
+
+
+def _prune(directories):
+    """Remove whichever of `directories` (and their parents) are now empty, keeping the upload folders."""
+    storage = media_storage()
+    keep = set(upload_dirs()) | {''}
+    # Deepest first, so a hash folder goes after its variants/ folder
+    pending = sorted(directories, key=lambda name: name.count('/'), reverse=True)
+    while pending:
+        directory = pending.pop(0)
+        if directory in keep:
+            continue
+        path = storage.path(directory)
+        if os.path.isdir(path) and not os.listdir(path):
+            os.rmdir(path)
+            parent = posixpath.dirname(directory)
+            if parent not in pending:
+                pending.append(parent)
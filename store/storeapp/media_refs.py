@@ -0,0 +1,68 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from .images import IMAGE_FIELDS
+from .models import StoredFile
+
+# --- Media reference counts ---
+#
+# StoredFile.ref_count says how many rows across the image fields point at a
+# file. Saves and deletes adjust it through signals and bulk imports call
+# change() directly; both use one CASE-per-name UPDATE. A file whose count
+# reaches zero is left on disk for the media clean-up to collect, since a new
+# upload of the same picture may be about to reuse it. recount() rebuilds all
+# counts from the rows themselves.
+
+RECOUNT_BATCH_SIZE = 500
+
+
+def _per_name(counts):
+    return Case(
+        *[When(name=name, then=Value(count)) for name, count in counts.items()],
+        output_field=IntegerField(),
+    )
+
+
+def change(added=(), removed=()):
+    """Count one more reference for each name in `added` and one fewer for each in `removed`."""
+    counts = Counter(name for name in added if name)
+    counts.subtract(name for name in removed if name)
+    gained = {name: count for name, count in counts.items() if count > 0}
+    lost = {name: -count for name, count in counts.items() if count < 0}
+    if gained:
+        StoredFile.objects.bulk_create([StoredFile(name=name) for name in gained], ignore_conflicts=True)
+        StoredFile.objects.filter(name__in=gained).update(ref_count=F('ref_count') + _per_name(gained))
+    if lost:
+        StoredFile.objects.filter(name__in=lost).update(
+            ref_count=Greatest(F('ref_count') - _per_name(lost), Value(0)),
+        )
+
+
+def references(names=None, fields=IMAGE_FIELDS):
+    """Counter of rows pointing at each file name, read from the (model, field) pairs in `fields`."""
+    counts = Counter()
+    for model, field in fields:
+        rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        if names is not None:
+            rows = rows.filter(**{f'{field}__in': names})
+        for name, count in rows.order_by().values(field).annotate(count=Count('pk')).values_list(field, 'count'):
+            counts[name] += count
+    return counts
+
+
+def recount():
+    """Rewrite every StoredFile count from the rows that reference it. Returns the number of files referenced."""
+    counts = references()
+    with transaction.atomic():
+        StoredFile.objects.update(ref_count=0)
+        StoredFile.objects.bulk_create(
+            [StoredFile(name=name, ref_count=count) for name, count in counts.items()],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['ref_count'],
+            batch_size=RECOUNT_BATCH_SIZE,
+        )
+    return len(counts)
@@ -0,0 +1,18 @@
+from django.utils.functional import SimpleLazyObject
+
+from .principals import get_principal
+
+
+class PrincipalMiddleware:
+    """Attach the session's customer, seller or admin as `request.principal`.
+
+    Resolved lazily on first access and at most once per request, the same
+    way AuthenticationMiddleware provides `request.user`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: get_principal(request))
+        return self.get_response(request)
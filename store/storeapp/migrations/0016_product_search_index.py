@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from storeapp import search
+
+    search.install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from storeapp import search
+
+    if not search.is_supported(schema_editor.connection):
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {search.FTS_TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0015_remove_order_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_is_visible(apps, schema_editor):
+    """Copy seller approval onto products, one id range at a time."""
+    Product = apps.get_model('storeapp', 'Product')
+    last_id = Product.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        Product.objects.filter(
+            id__gte=start, id__lt=start + BATCH_SIZE, seller__is_approved=True,
+        ).update(is_visible=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0016_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_visible',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_is_visible, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_visible', 'category', 'price', 'id'], name='product_catalog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_visible', 'price', 'id'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_visible', 'id'], name='product_visible_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def clear_duplicate_payment_ids(apps, schema_editor):
+    """Blank and repeated payment ids would break the unique constraint; keep the first."""
+    Payment = apps.get_model('storeapp', 'Payment')
+    Payment.objects.filter(razorpay_payment_id='').update(razorpay_payment_id=None)
+    duplicates = (
+        Payment.objects.exclude(razorpay_payment_id=None)
+        .values('razorpay_payment_id').annotate(n=Count('id')).filter(n__gt=1)
+        .values_list('razorpay_payment_id', flat=True)
+    )
+    for payment_id in duplicates:
+        first = Payment.objects.filter(razorpay_payment_id=payment_id).order_by('id').first()
+        Payment.objects.filter(razorpay_payment_id=payment_id).exclude(id=first.id).update(razorpay_payment_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0017_product_is_visible'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='razorpay_payment_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(clear_duplicate_payment_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='razorpay_payment_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='OrderIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.customer')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.order')),
+            ],
+        ),
+    ]
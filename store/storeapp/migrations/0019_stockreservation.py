@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0018_order_idempotency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.customer')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('customer', 'product'), name='unique_reservation_per_product')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0019_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.seller')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'product'), name='unique_daily_product_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySellerSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.seller')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'seller'), name='unique_daily_seller_sales')],
+            },
+        ),
+    ]
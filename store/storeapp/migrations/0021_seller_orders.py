@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+BATCH_SIZE = 1000
+
+
+def backfill_seller_orders(apps, schema_editor):
+    """One SellerOrder per (order, seller) from existing order items, one order id range at a time.
+
+    Order status was never stored, so every existing order starts out Pending.
+    """
+    Order = apps.get_model('storeapp', 'Order')
+    OrderItem = apps.get_model('storeapp', 'OrderItem')
+    SellerOrder = apps.get_model('storeapp', 'SellerOrder')
+    last_id = Order.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        shares = (
+            OrderItem.objects.filter(order_id__gte=start, order_id__lt=start + BATCH_SIZE)
+            .values('order_id', 'order__created_at', 'product__seller_id')
+            .annotate(subtotal=Sum(F('price') * F('quantity')), item_count=Sum('quantity'))
+            .order_by()
+        )
+        SellerOrder.objects.bulk_create([
+            SellerOrder(
+                order_id=share['order_id'],
+                seller_id=share['product__seller_id'],
+                subtotal=share['subtotal'],
+                item_count=share['item_count'],
+                created_at=share['order__created_at'],
+            )
+            for share in shares
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0020_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item_count', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Confirmed', 'Confirmed'), ('Cancelled', 'Cancelled')], default='Pending', max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to='storeapp.order')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.seller')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', 'status', 'created_at', 'id'], name='seller_order_queue_idx'), models.Index(fields=['seller', 'created_at', 'id'], name='seller_order_history_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'seller'), name='unique_seller_order')],
+            },
+        ),
+        migrations.RunPython(backfill_seller_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+OLD_TO_NEW = {'Pending': 'placed', 'Confirmed': 'confirmed', 'Cancelled': 'cancelled'}
+NEW_TO_OLD = {'placed': 'Pending', 'confirmed': 'Confirmed', 'shipped': 'Confirmed',
+              'delivered': 'Confirmed', 'cancelled': 'Cancelled'}
+
+
+def forwards(apps, schema_editor):
+    """Rename the seller order states, then derive each order's status from them."""
+    Order = apps.get_model('storeapp', 'Order')
+    SellerOrder = apps.get_model('storeapp', 'SellerOrder')
+    for old, new in OLD_TO_NEW.items():
+        SellerOrder.objects.filter(status=old).update(status=new)
+
+    # Only placed/confirmed/cancelled exist so far: an order is as far along
+    # as its slowest seller, and cancelled once every seller has cancelled.
+    shares = SellerOrder.objects.filter(order=OuterRef('pk'))
+    Order.objects.filter(
+        ~Exists(shares.filter(status='placed')), Exists(shares.filter(status='confirmed')),
+    ).update(status='confirmed')
+    Order.objects.filter(
+        Exists(shares), ~Exists(shares.exclude(status='cancelled')),
+    ).update(status='cancelled')
+
+
+def backwards(apps, schema_editor):
+    SellerOrder = apps.get_model('storeapp', 'SellerOrder')
+    for new, old in NEW_TO_OLD.items():
+        SellerOrder.objects.filter(status=new).update(status=old)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0021_seller_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('to_status', models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('changed_by', models.CharField(max_length=50)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='placed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='sellerorder',
+            name='status',
+            field=models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='placed', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='order_status_queue_idx'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.AddField(
+            model_name='orderstatuschange',
+            name='seller_order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='storeapp.sellerorder'),
+        ),
+    ]
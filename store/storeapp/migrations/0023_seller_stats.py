@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0022_order_status_workflow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='storeapp.seller')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('recent_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('recent_units', models.PositiveIntegerField(default=0)),
+                ('recent_orders', models.PositiveIntegerField(default=0)),
+                ('recent_as_of', models.DateField(blank=True, null=True)),
+                ('low_stock_products', models.PositiveIntegerField(default=0)),
+                ('feedback_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
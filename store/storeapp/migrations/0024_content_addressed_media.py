@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:42
+
+from collections import Counter
+
+import storeapp.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+IMAGE_FIELDS = [('Product', 'photo'), ('Customer', 'photo'), ('CommunityPost', 'image'), ('Seller', 'passbook')]
+
+
+def count_references(apps, schema_editor):
+    """One StoredFile per file the existing rows point at, with its reference count."""
+    StoredFile = apps.get_model('storeapp', 'StoredFile')
+    counts = Counter()
+    for model_name, field in IMAGE_FIELDS:
+        rows = apps.get_model('storeapp', model_name).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        for name, count in rows.order_by().values(field).annotate(count=Count('pk')).values_list(field, 'count'):
+            counts[name] += count
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, ref_count=count) for name, count in counts.items()], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0023_seller_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='communitypost',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=storeapp.storage.media_storage, upload_to='community_posts/'),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='photo',
+            field=models.ImageField(storage=storeapp.storage.media_storage, upload_to='customer_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='photo',
+            field=models.ImageField(storage=storeapp.storage.media_storage, upload_to='product_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='seller',
+            name='passbook',
+            field=models.ImageField(storage=storeapp.storage.media_storage, upload_to='seller_passbooks/'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
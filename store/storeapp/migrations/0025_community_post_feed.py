@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0024_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['created_at', 'id'], name='community_post_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0025_community_post_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at', 'id'], name='order_customer_history_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0026_order_customer_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('status', models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('first_name', models.CharField(max_length=50)),
+                ('last_name', models.CharField(max_length=50)),
+                ('address', models.CharField(max_length=255)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('zip_code', models.CharField(max_length=10)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=20)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.customer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cost_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='storeapp.archivedorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('razorpay_payment_id', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.customer')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment', to='storeapp.archivedorder')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSellerOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item_count', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to='storeapp.archivedorder')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storeapp.seller')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderStatusChange',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('from_status', models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('to_status', models.CharField(choices=[('placed', 'Placed'), ('confirmed', 'Confirmed'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('changed_by', models.CharField(max_length=50)),
+                ('changed_at', models.DateTimeField()),
+                ('seller_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='storeapp.archivedsellerorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', 'created_at', 'id'], name='archived_order_customer_idx'),
+        ),
+    ]
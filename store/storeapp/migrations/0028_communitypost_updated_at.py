@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    CommunityPost = apps.get_model('storeapp', 'CommunityPost')
+    CommunityPost.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0027_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communitypost',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
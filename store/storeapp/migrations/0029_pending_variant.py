@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storeapp', '0028_communitypost_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
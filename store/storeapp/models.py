@@ -1,5 +1,7 @@
 from django.db import models
 
+from .storage import media_storage
+
 # --- Customer / user Model ---
 
 class Customer(models.Model):
@@ -11,7 +13,7 @@ class Customer(models.Model):
     email = models.EmailField(unique=True) 
     phone = models.CharField(max_length=20)
     age = models.IntegerField()
-    photo = models.ImageField(upload_to='customer_photos/')
+    photo = models.ImageField(upload_to='customer_photos/', storage=media_storage)
 
     def __str__(self):
         return self.name
@@ -27,12 +29,17 @@ class Seller(models.Model):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20)
     kudumbasree_details = models.CharField(max_length=90)
-    passbook = models.ImageField(upload_to='seller_passbooks/')
+    passbook = models.ImageField(upload_to='seller_passbooks/', storage=media_storage)
     is_approved = models.BooleanField(default=False)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep the denormalized storefront flag on this seller's products in step
+        self.product_set.exclude(is_visible=self.is_approved).update(is_visible=self.is_approved)
+
 # --- Product model ---
 
 class Product(models.Model):
@@ -43,11 +50,25 @@ class Product(models.Model):
     cost_price = models.DecimalField(max_digits=10, decimal_places=2, default=0) # ADDED: To calculate profit
     stock = models.IntegerField()
     category = models.CharField(max_length=50, default='General') 
-    photo = models.ImageField(upload_to='product_photos/')
+    photo = models.ImageField(upload_to='product_photos/', storage=media_storage)
+    # Mirrors seller.is_approved so storefront queries don't need to join Seller
+    is_visible = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_visible', 'category', 'price', 'id'], name='product_catalog_idx'),
+            models.Index(fields=['is_visible', 'price', 'id'], name='product_price_idx'),
+            models.Index(fields=['is_visible', 'id'], name='product_visible_idx'),
+        ]
 
     def __str__(self):
         return self.product_name
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.is_visible = self.seller.is_approved
+        super().save(*args, **kwargs)
+
 # --- CartItem model ---
 
 class CartItem(models.Model):
@@ -64,13 +85,39 @@ class CartItem(models.Model):
     def total_price(self):
         return self.quantity * self.product.price
 
+class StockReservation(models.Model):
+    """Units of a product held for a customer between checkout and payment."""
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'product'], name='unique_reservation_per_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for {self.customer_id}"
+
 # --- Order Models ---
 
 
+class OrderStatus(models.TextChoices):
+    """Fulfilment states shared by Order and SellerOrder; fulfilment.py holds the allowed moves."""
+    PLACED = 'placed', 'Placed'
+    CONFIRMED = 'confirmed', 'Confirmed'
+    SHIPPED = 'shipped', 'Shipped'
+    DELIVERED = 'delivered', 'Delivered'
+    CANCELLED = 'cancelled', 'Cancelled'
+
+
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Summary of the seller orders, kept in sync by fulfilment.sync_order_status()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices, default=OrderStatus.PLACED)
     # Address details captured at the time of order
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
@@ -81,6 +128,12 @@ class Order(models.Model):
     email = models.EmailField()
     phone = models.CharField(max_length=20)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_queue_idx'),
+            models.Index(fields=['customer', 'created_at', 'id'], name='order_customer_history_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.customer.name}"
     
@@ -98,19 +151,211 @@ class Payment(models.Model):
     """Stores details of a successful payment."""
     order = models.OneToOneField(Order, on_delete=models.CASCADE)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
-    razorpay_payment_id = models.CharField(max_length=100)
+    # Unique so a replayed payment callback can never create a second order
+    razorpay_payment_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Payment {self.razorpay_payment_id} for Order {self.order.id}"
 
+class OrderIdempotencyKey(models.Model):
+    """Remembers which order a checkout form submission created, so retries reuse it."""
+    key = models.CharField(max_length=64, unique=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Key {self.key} for Order {self.order_id}"
+
+class SellerOrder(models.Model):
+    """One seller's share of an order: their lines' subtotal and fulfilment status.
+
+    Written at checkout, so a seller's order queue is a single indexed range
+    instead of a DISTINCT join through OrderItem and Product.
+    """
+    order = models.ForeignKey(Order, related_name='seller_orders', on_delete=models.CASCADE)
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices, default=OrderStatus.PLACED)
+    created_at = models.DateTimeField()  # copied from the order
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'seller'], name='unique_seller_order'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'status', 'created_at', 'id'], name='seller_order_queue_idx'),
+            models.Index(fields=['seller', 'created_at', 'id'], name='seller_order_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id} for {self.seller_id} ({self.status})"
+
+
+class OrderStatusChange(models.Model):
+    """Log of every fulfilment status change, written by fulfilment.transition()."""
+    seller_order = models.ForeignKey(SellerOrder, related_name='status_changes', on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    to_status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    changed_by = models.CharField(max_length=50)  # "seller:<id>" or "admin"
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.seller_order_id}: {self.from_status} -> {self.to_status}"
+
+# --- Order archive ---
+# Closed orders past settings.ORDER_ARCHIVE_AFTER_DAYS, moved here by
+# archive.py with their ids and columns unchanged, so the live order tables
+# only hold recent and open orders. Ids are copied, not generated.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(db_index=True)
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    first_name = models.CharField(max_length=50)
+    last_name = models.CharField(max_length=50)
+    address = models.CharField(max_length=255)
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+    zip_code = models.CharField(max_length=10)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'created_at', 'id'], name='archived_order_customer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id} by {self.customer.name}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.product_name}"
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.OneToOneField(ArchivedOrder, related_name='payment', on_delete=models.CASCADE)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    razorpay_payment_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Payment {self.razorpay_payment_id} for archived order {self.order_id}"
+
+class ArchivedSellerOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='seller_orders', on_delete=models.CASCADE)
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived order {self.order_id} for {self.seller_id} ({self.status})"
+
+class ArchivedOrderStatusChange(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    seller_order = models.ForeignKey(ArchivedSellerOrder, related_name='status_changes', on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    to_status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    changed_by = models.CharField(max_length=50)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.seller_order_id}: {self.from_status} -> {self.to_status}"
+
+# --- Seller KPIs ---
+
+class SellerStats(models.Model):
+    """Running totals for a seller's dashboard, kept up to date by seller_stats.py."""
+    seller = models.OneToOneField(Seller, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    # Rolling window ending on recent_as_of (see seller_stats.RECENT_DAYS)
+    recent_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    recent_units = models.PositiveIntegerField(default=0)
+    recent_orders = models.PositiveIntegerField(default=0)
+    recent_as_of = models.DateField(null=True, blank=True)
+    low_stock_products = models.PositiveIntegerField(default=0)
+    feedback_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for seller {self.seller_id}"
+
+# --- Sales Rollups ---
+
+class DailyProductSales(models.Model):
+    """One product's sales on one day, added to at checkout and rebuildable from OrderItem."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}"
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost
+
+class DailySellerSales(models.Model):
+    """One seller's sales on one day, added to at checkout alongside DailyProductSales."""
+    date = models.DateField()
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'seller'], name='unique_daily_seller_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} on {self.date}"
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost
+
 # --- Community Post Model ---
 class CommunityPost(models.Model):
     """Stores community posts created by the admin."""
     description = models.TextField(blank=True, null=True)
-    image = models.ImageField(upload_to='community_posts/', blank=True, null=True)
+    image = models.ImageField(upload_to='community_posts/', storage=media_storage, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the cached HTML's key, so an edit is never served stale (see feed.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='community_post_feed_idx'),
+        ]
 
     def __str__(self):
         return f"Post {self.id} on {self.created_at.date()}"
@@ -125,3 +370,23 @@ class Feedback(models.Model):
     def __str__(self):
         return f"Feedback from {self.customer.name} to {self.seller.name}"
 
+
+# --- Stored media ---
+
+class StoredFile(models.Model):
+    """One content-addressed media file and how many rows point at it."""
+    name = models.CharField(max_length=100, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PendingVariant(models.Model):
+    """An uploaded picture whose resized variants are still to be made by make_image_variants."""
+    name = models.CharField(max_length=100, unique=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
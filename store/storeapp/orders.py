@@ -0,0 +1,116 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from . import reservations, rollups, seller_stats
+from .models import CartItem, Order, OrderIdempotencyKey, OrderItem, Payment, SellerOrder
+from .stock import OutOfStockError  # noqa: F401 (raised by place_order)
+
+# --- Order placement ---
+#
+# Turning a cart into an order takes a fixed number of statements however
+# many lines the cart has: one read of the cart with its products, one
+# conditional stock update (net of any checkout holds), and one insert per
+# table. Each seller's share of the order is written alongside it as a
+# SellerOrder, which is what the seller's order queue reads.
+#
+# Placement is idempotent: a resubmitted checkout form (same idempotency
+# key) or a replayed payment callback (same payment id) gets back the order
+# that was already created instead of a duplicate. A payment id or key that
+# belongs to another customer's order is refused with CheckoutConflictError.
+
+SHIPPING_CHARGE = Decimal('50.00')
+
+
+class CheckoutConflictError(Exception):
+    """Raised when the payment id or idempotency key is already on another customer's order."""
+
+
+def find_placed_order(customer, payment_id=None, idempotency_key=None):
+    """The order an earlier submission of this checkout created, if any."""
+    if idempotency_key:
+        order_id = OrderIdempotencyKey.objects.filter(
+            key=idempotency_key, customer=customer,
+        ).values_list('order_id', flat=True).first()
+        if order_id:
+            return Order.objects.get(id=order_id)
+    if payment_id:
+        order_id = Payment.objects.filter(
+            razorpay_payment_id=payment_id, customer=customer,
+        ).values_list('order_id', flat=True).first()
+        if order_id:
+            return Order.objects.get(id=order_id)
+    return None
+
+
+def place_order(customer, shipping, payment_id, idempotency_key=None):
+    """Create an order from the customer's cart and empty the cart.
+
+    `shipping` holds the Order address fields. Returns (order, created);
+    order is None if there was nothing to place.
+    """
+    order = find_placed_order(customer, payment_id, idempotency_key)
+    if order:
+        return order, False
+    try:
+        order = _create_order(customer, shipping, payment_id, idempotency_key)
+    except IntegrityError as error:
+        # A concurrent retry of the same checkout committed first
+        order = find_placed_order(customer, payment_id, idempotency_key)
+        if order is None:
+            raise CheckoutConflictError(payment_id or idempotency_key) from error
+        return order, False
+    return order, order is not None
+
+
+def _create_order(customer, shipping, payment_id, idempotency_key):
+    with transaction.atomic():
+        cart_items = list(CartItem.objects.filter(customer=customer).select_related('product'))
+        if not cart_items:
+            return None
+
+        total_price = sum(item.total_price for item in cart_items) + SHIPPING_CHARGE
+        order = Order.objects.create(customer=customer, total_price=total_price, **shipping)
+        if idempotency_key:
+            # Claim the key before doing any real work
+            OrderIdempotencyKey.objects.create(key=idempotency_key, customer=customer, order=order)
+
+        quantities = {}
+        for item in cart_items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        reservations.consume(customer, quantities)
+
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                price=item.product.price,
+                cost_price=item.product.cost_price,
+            )
+            for item in cart_items
+        ])
+        seller_orders = SellerOrder.objects.bulk_create(_seller_orders(order, cart_items))
+        Payment.objects.create(
+            order=order,
+            customer=customer,
+            razorpay_payment_id=payment_id or None,
+            amount=total_price,
+        )
+        CartItem.objects.filter(customer=customer).delete()
+        rollups.record_order(order, order_items)
+        seller_stats.record_order(seller_orders)
+    return order
+
+
+def _seller_orders(order, cart_items):
+    """One SellerOrder per seller with lines in the order."""
+    shares = {}
+    for item in cart_items:
+        share = shares.setdefault(item.product.seller_id, SellerOrder(
+            order=order, seller_id=item.product.seller_id,
+            subtotal=Decimal('0.00'), item_count=0, created_at=order.created_at,
+        ))
+        share.subtotal += item.total_price
+        share.item_count += item.quantity
+    return list(shares.values())
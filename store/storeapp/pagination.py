@@ -0,0 +1,164 @@
+import datetime
+import hashlib
+from decimal import Decimal
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# --- Keyset (cursor) pagination ---
+#
+# Pages are fetched with "WHERE (sort key, id) > (last seen)" instead of an
+# OFFSET, so page 500 costs the same as page 1 and no COUNT(*) is needed to
+# render the navigation. Cursors are signed so they stay opaque to clients,
+# and carry the ordering they were made for: a cursor replayed under a
+# different sort is ignored rather than read as a position in it.
+
+CURSOR_SALT = 'storeapp.pagination.cursor'
+COUNT_CACHE_TIMEOUT = 300  # seconds
+
+
+class KeysetPage:
+    """One page of results plus the cursors to its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginate `queryset` by `ordering`, which must end in a unique key.
+
+    `ordering` uses the usual order_by() syntax, e.g. ('-price', '-id').
+    Annotations may be used as sort keys as long as they are applied to
+    `queryset` before it is handed over; aggregate annotations work too,
+    the cursor condition then lands in HAVING. Both model instances and
+    values() dicts are accepted as rows.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('id',)):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        limit = self.per_page + 1
+
+        if position is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:limit])
+            page_rows = rows[:self.per_page]
+            return KeysetPage(
+                page_rows,
+                next_cursor=self._cursor(page_rows, 'next') if len(rows) > self.per_page else None,
+            )
+
+        direction, values = position
+        if direction == 'next':
+            rows = list(
+                self.queryset.filter(self._beyond(values)).order_by(*self.ordering)[:limit]
+            )
+            page_rows = rows[:self.per_page]
+            return KeysetPage(
+                page_rows,
+                next_cursor=self._cursor(page_rows, 'next') if len(rows) > self.per_page else None,
+                previous_cursor=self._cursor(page_rows, 'previous'),
+            )
+
+        reverse_ordering = [name[1:] if name.startswith('-') else '-' + name for name in self.ordering]
+        rows = list(
+            self.queryset.filter(self._beyond(values, backwards=True)).order_by(*reverse_ordering)[:limit]
+        )
+        page_rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            page_rows,
+            next_cursor=self._cursor(page_rows, 'next'),
+            previous_cursor=self._cursor(page_rows, 'previous') if len(rows) > self.per_page else None,
+        )
+
+    def _beyond(self, values, backwards=False):
+        """Rows strictly after (or before) `values` in the page ordering."""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            equal = {key: values[i] for i, (key, _) in enumerate(self.keys[:index])}
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[index]})
+        return condition
+
+    def _cursor(self, rows, direction):
+        if not rows:
+            return None
+        row = rows[-1] if direction == 'next' else rows[0]
+        values = [self._dump(row[name] if isinstance(row, dict) else getattr(row, name)) for name, _ in self.keys]
+        return signing.dumps([direction, list(self.ordering), values], salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return (direction, key values) for a cursor, or None if it is unusable."""
+        if not cursor:
+            return None
+        try:
+            direction, ordering, values = signing.loads(cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+        if direction not in ('next', 'previous') or tuple(ordering) != self.ordering or len(values) != len(self.keys):
+            return None
+        try:
+            return direction, [self._load(name, value) for (name, _), value in zip(self.keys, values)]
+        except ValidationError:
+            return None
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return value
+
+    def _load(self, name, value):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field.to_python(value)
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """COUNT(*) for `queryset`, cached for a few minutes.
+
+    Good enough for "about N results" labels, and keeps crawlers paging
+    through the catalog from re-counting it on every request.
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(key, count, timeout)
+    return count
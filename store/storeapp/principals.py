@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .models import Customer, Seller
+
+# --- Logged-in principal ---
+#
+# Who the session belongs to, as (type, id), cached so that pages which only
+# need the customer's id (the storefront header, the cart badge) don't query
+# the Customer or Seller table on every request. Views that need the whole
+# row load it with get_logged_in_user(), which fills this cache as it goes.
+
+Principal = namedtuple('Principal', ['type', 'id'])
+
+ANONYMOUS = Principal(None, None)
+ADMIN = Principal('admin', None)
+PRINCIPAL_CACHE_TIMEOUT = 15 * 60
+PRINCIPAL_MODELS = {'customer': Customer, 'seller': Seller}
+
+
+def principal_cache_key(user_type, user_id):
+    return f'principal:{user_type}:{user_id}'
+
+
+def load_principal(user_type, user_id):
+    """Read a principal from the cache, falling back to one narrow query."""
+    key = principal_cache_key(user_type, user_id)
+    if cache.get(key) is None:
+        if not PRINCIPAL_MODELS[user_type].objects.filter(id=user_id).exists():
+            return ANONYMOUS
+        cache.set(key, user_id, PRINCIPAL_CACHE_TIMEOUT)
+    return Principal(user_type, user_id)
+
+
+def remember_principal(user_type, user):
+    """Cache the principal for a Customer/Seller row the caller has just loaded."""
+    cache.set(principal_cache_key(user_type, user.id), user.id, PRINCIPAL_CACHE_TIMEOUT)
+    return Principal(user_type, user.id)
+
+
+def get_principal(request):
+    """The principal for this request's session (ANONYMOUS if nobody is logged in)."""
+    user_type = request.session.get('user_type')
+    user_id = request.session.get('user_id')
+    if user_type == 'admin':
+        return ADMIN
+    if not user_id or user_type not in PRINCIPAL_MODELS:
+        return ANONYMOUS
+    return load_principal(user_type, user_id)
+
+
+def invalidate_principal(user_type, user_id):
+    cache.delete(principal_cache_key(user_type, user_id))
@@ -0,0 +1,279 @@
+import csv
+import io
+import posixpath
+import zipfile
+import zlib
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from PIL import Image
+
+from . import facets, images, media_refs, seller_stats
+from .models import Product
+
+# --- Bulk product import and bulk edits ---
+#
+# A seller uploads a CSV (one product per row) plus an optional zip of the
+# photos it names. Rows are read and validated one at a time and written in
+# chunks: bulk_create for new product names, bulk_update for names the seller
+# already has. A bad row is reported by line number and skipped; it never
+# holds up the rest of the file. The stock/price grid on the dashboard is
+# applied with one CASE-per-row UPDATE, like the stock helpers in stock.py.
+#
+# Bulk writes skip the post_save signals, so the catalog facets and the
+# seller's low-stock counter are refreshed here once per import or edit.
+
+IMPORT_COLUMNS = ['product_name', 'description', 'price', 'cost_price', 'stock', 'category', 'photo']
+REQUIRED_COLUMNS = {'product_name', 'price', 'stock'}
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 200
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Fields an import row writes onto an existing product. Not stock: the file
+# may be older than sales and checkout holds made since, and it doesn't say
+# what stock it started from, so it can't be applied as a difference the
+# way the grid does. The stock column is the opening stock of new products.
+UPDATE_FIELDS = ['description', 'price', 'cost_price', 'category', 'photo']
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated', 'errors', 'error_count'])
+
+
+class ImportFileError(Exception):
+    """The upload as a whole can't be read (wrong format, missing columns)."""
+
+
+def _photos(images_zip):
+    """{file name: ZipInfo} for the image files in the uploaded zip."""
+    if images_zip is None:
+        return None, {}
+    try:
+        archive = zipfile.ZipFile(images_zip)
+    except zipfile.BadZipFile:
+        raise ImportFileError('The photos file is not a valid zip archive.')
+    members = {
+        posixpath.basename(info.filename): info
+        for info in archive.infolist()
+        if not info.is_dir() and posixpath.basename(info.filename)
+    }
+    return archive, members
+
+
+def _read_photo(archive, info):
+    if info.file_size > MAX_IMAGE_BYTES:
+        raise ValidationError(f'photo {info.filename} is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+    try:
+        data = archive.read(info)
+    except (zipfile.BadZipFile, EOFError, zlib.error, NotImplementedError, RuntimeError) as error:
+        # CRC mismatch, truncated member, unsupported compression or encryption
+        raise ValidationError(f'photo {info.filename} could not be read from the zip ({error})')
+    try:
+        Image.open(io.BytesIO(data)).verify()
+    except Exception:
+        raise ValidationError(f'photo {info.filename} is not an image')
+    return ContentFile(data, name=posixpath.basename(info.filename))
+
+
+def _decimal(row, column, default=None):
+    value = (row.get(column) or '').strip()
+    if not value:
+        if default is None:
+            raise ValidationError(f'{column} is required')
+        return default
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValidationError(f'{column} "{value}" is not a number')
+
+
+def _clean_row(row):
+    """Validated field values for one CSV row; raises ValidationError."""
+    values = {
+        'product_name': (row.get('product_name') or '').strip(),
+        'description': (row.get('description') or '').strip(),
+        'category': (row.get('category') or '').strip() or 'General',
+        'price': _decimal(row, 'price'),
+        'cost_price': _decimal(row, 'cost_price', Decimal('0')),
+    }
+    stock = (row.get('stock') or '').strip()
+    if not stock.isdigit():
+        raise ValidationError(f'stock "{stock}" must be a whole number of 0 or more')
+    values['stock'] = int(stock)
+    if values['price'] < 0 or values['cost_price'] < 0:
+        raise ValidationError('price and cost_price cannot be negative')
+
+    # Lengths and decimal places as the model defines them
+    try:
+        Product(**values).clean_fields(exclude=['seller', 'photo', 'is_visible'])
+    except ValidationError as error:
+        raise ValidationError([
+            f'{field}: {message}' for field, messages in error.message_dict.items() for message in messages
+        ])
+    return values
+
+
+def parse_rows(csv_file):
+    """Yield (line number, row dict) from an uploaded CSV without reading it all into memory."""
+    text = io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    columns = {(name or '').strip() for name in reader.fieldnames or []}
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        raise ImportFileError(f'The CSV is missing the column(s): {", ".join(sorted(missing))}.')
+    for row in reader:
+        yield reader.line_num, {(key or '').strip(): value for key, value in row.items()}
+
+
+def _write_chunk(to_create, to_update, previous_photos):
+    with transaction.atomic():
+        Product.objects.bulk_create(to_create)
+        Product.objects.bulk_update(to_update, UPDATE_FIELDS)
+        # Bulk writes skip the signals that keep the file reference counts
+        media_refs.change(
+            added=[product.photo.name for product in to_create + to_update], removed=previous_photos,
+        )
+
+
+def import_products(seller, csv_file, images_zip=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Create or update `seller`'s products from an uploaded CSV and optional photo zip.
+
+    Rows are matched to existing products by product_name. New products
+    need a photo from the zip; existing ones keep theirs unless the row
+    names a new one, and keep their stock whatever the row says. Returns an ImportResult with counts and up to
+    MAX_REPORTED_ERRORS (line number, message) pairs.
+    """
+    archive, photos = _photos(images_zip)
+    rows = parse_rows(csv_file)
+    existing = {
+        name: (product_id, photo)
+        for product_id, name, photo in Product.objects.filter(seller=seller).values_list('id', 'product_name', 'photo')
+    }
+
+    created = updated = error_count = 0
+    errors = []
+    seen = set()
+    stored_photos = {}  # zip member -> stored file name, so a shared photo is saved once
+    to_create, to_update, previous_photos = [], [], []
+
+    try:
+        for line, row in rows:
+            try:
+                values = _clean_row(row)
+                if values['product_name'] in seen:
+                    raise ValidationError(f'"{values["product_name"]}" appears more than once in the file')
+
+                photo_name = (row.get('photo') or '').strip()
+                photo = None
+                if photo_name:
+                    if photo_name not in photos:
+                        raise ValidationError(f'photo {photo_name} is not in the zip')
+                    photo = stored_photos.get(photo_name) or _read_photo(archive, photos[photo_name])
+                match = existing.get(values['product_name'])
+                if match is None and photo is None:
+                    raise ValidationError('a photo is required for a new product')
+            except ValidationError as error:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((line, '; '.join(error.messages)))
+                continue
+
+            seen.add(values['product_name'])
+            if match is None:
+                product = Product(seller=seller, is_visible=seller.is_approved, **values)
+                to_create.append(product)
+            else:
+                product = Product(id=match[0], seller=seller, photo=match[1], **values)
+                to_update.append(product)
+                previous_photos.append(match[1])
+            if isinstance(photo, str):
+                product.photo = photo
+            elif photo is not None:
+                product.photo.save(photo.name, photo, save=False)
+                stored_photos[photo_name] = product.photo.name
+                if not images.has_variants(product.photo.name):
+                    images.schedule_variants(product.photo.name)
+
+            if len(to_create) + len(to_update) >= chunk_size:
+                _write_chunk(to_create, to_update, previous_photos)
+                created, updated = created + len(to_create), updated + len(to_update)
+                to_create, to_update, previous_photos = [], [], []
+    except UnicodeDecodeError:
+        raise ImportFileError('The CSV must be saved as UTF-8.')
+    except csv.Error as error:
+        raise ImportFileError(f'The CSV could not be read: {error}.')
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if to_create or to_update:
+        _write_chunk(to_create, to_update, previous_photos)
+        created, updated = created + len(to_create), updated + len(to_update)
+    if created or updated:
+        facets.invalidate_catalog()
+        seller_stats.refresh_low_stock(seller_ids=[seller.id])
+    return ImportResult(created, updated, errors, error_count)
+
+
+def grid_changes(data, products):
+    """Read the dashboard grid for `products` out of POST `data`.
+
+    Each product posts price_<id>, cost_price_<id>, stock_<id> and the stock
+    it was shown with, stock_was_<id>. Returns ({product_id: change}, errors)
+    with only the products whose values were edited.
+    """
+    changes, errors = {}, []
+    for product in products:
+        if f'price_{product.id}' not in data:
+            continue
+        row = {
+            column: data.get(f'{column}_{product.id}', '')
+            for column in ('price', 'cost_price', 'stock', 'stock_was')
+        }
+        try:
+            price, cost_price = _decimal(row, 'price'), _decimal(row, 'cost_price', Decimal('0'))
+            stock, stock_was = int(row['stock']), int(row['stock_was'])
+            if price < 0 or cost_price < 0 or stock < 0:
+                raise ValidationError('values cannot be negative')
+            Product(price=price, cost_price=cost_price).clean_fields(
+                exclude=['seller', 'product_name', 'description', 'stock', 'photo'],
+            )
+        except (ValidationError, ValueError) as error:
+            problems = error.messages if isinstance(error, ValidationError) else ['stock must be a whole number']
+            errors.append((product.product_name, '; '.join(problems)))
+            continue
+        if (price, cost_price, stock) != (product.price, product.cost_price, stock_was):
+            changes[product.id] = {'price': price, 'cost_price': cost_price, 'stock_delta': stock - stock_was}
+    return changes, errors
+
+
+def update_prices_and_stock(seller, changes):
+    """Apply {product_id: {'price', 'cost_price', 'stock_delta'}} to `seller`'s products in one UPDATE.
+
+    Stock is moved by the difference the seller typed rather than set
+    outright, so units sold while the grid was open aren't written back.
+    A delta that would take stock below zero leaves it at zero. Returns the
+    number of products updated.
+    """
+    if not changes:
+        return 0
+
+    def per_product(key, output_field):
+        return Case(
+            *[When(id=product_id, then=Value(change[key])) for product_id, change in changes.items()],
+            output_field=output_field,
+        )
+
+    money = DecimalField(max_digits=10, decimal_places=2)
+    updated = Product.objects.filter(seller=seller, id__in=changes).update(
+        price=per_product('price', money),
+        cost_price=per_product('cost_price', money),
+        stock=Greatest(F('stock') + per_product('stock_delta', IntegerField()), Value(0)),
+    )
+    if updated:
+        facets.invalidate_catalog()
+        seller_stats.refresh_low_stock(seller_ids=[seller.id])
+    return updated
@@ -0,0 +1,104 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StockReservation
+from .stock import apply_stock_changes, increment_stock
+
+# --- Stock holds between checkout and payment ---
+#
+# Rendering the checkout page takes the cart's quantities out of
+# Product.stock and records them as StockReservation rows with an expiry.
+# Placing the order converts the holds into order items; holds that are
+# never paid for are handed back by the release_expired_reservations
+# command, which must be scheduled (see README). Only the difference from
+# the customer's current holds is ever written. A live hold keeps the
+# expiry it was created with, so reloading the checkout page can't hold
+# stock for longer than STOCK_RESERVATION_MINUTES. A hold that has lapsed
+# but not been swept yet still has its units out of stock; reloading gives
+# it a fresh expiry, otherwise the sweeper could hand those units back
+# while the customer is paying for them.
+#
+# select_for_update() serialises concurrent checkouts on PostgreSQL/MySQL.
+# SQLite ignores it; there transactions start in IMMEDIATE mode (see
+# DATABASES in settings.py), so the whole database is locked for the length
+# of each write transaction and other checkouts wait their turn.
+
+RESERVATION_TTL = datetime.timedelta(minutes=getattr(settings, 'STOCK_RESERVATION_MINUTES', 15))
+RELEASE_BATCH_SIZE = 500
+
+
+def _settle_holds(customer, quantities):
+    """Move stock so the customer's holds match `quantities`; return the old holds."""
+    held = dict(
+        StockReservation.objects.select_for_update()
+        .filter(customer=customer)
+        .values_list('product_id', 'quantity')
+    )
+    deltas = {
+        product_id: quantities.get(product_id, 0) - held.get(product_id, 0)
+        for product_id in set(held) | set(quantities)
+    }
+    apply_stock_changes({product_id: delta for product_id, delta in deltas.items() if delta})
+    return held
+
+
+def reserve(customer, quantities):
+    """Hold {product_id: quantity} for the customer until the TTL runs out.
+
+    Live holds keep their expiry and only their quantity changes; lapsed
+    ones get a new expiry. Raises stock.OutOfStockError (and holds nothing
+    new) if any product cannot cover the extra units.
+    """
+    now = timezone.now()
+    expires_at = now + RESERVATION_TTL
+    with transaction.atomic():
+        held = _settle_holds(customer, quantities)
+        dropped = set(held) - set(quantities)
+        if dropped:
+            StockReservation.objects.filter(customer=customer, product_id__in=dropped).delete()
+        StockReservation.objects.filter(customer=customer, expires_at__lte=now).update(expires_at=expires_at)
+        StockReservation.objects.bulk_create(
+            [
+                StockReservation(customer=customer, product_id=product_id, quantity=quantity, expires_at=expires_at)
+                for product_id, quantity in quantities.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['customer', 'product'],
+            update_fields=['quantity'],
+        )
+
+
+def consume(customer, quantities):
+    """Turn the customer's holds into a sale of exactly `quantities`.
+
+    Held units are already out of stock; only the difference is taken (or
+    given back). Must run inside the order's transaction.
+    """
+    held = _settle_holds(customer, quantities)
+    if held:
+        StockReservation.objects.filter(customer=customer).delete()
+
+
+def release_expired(batch_size=RELEASE_BATCH_SIZE, now=None):
+    """Return expired holds to stock, one batch per transaction. Returns the count released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                return released
+            returned = {}
+            for _, product_id, quantity in batch:
+                returned[product_id] = returned.get(product_id, 0) + quantity
+            increment_stock(returned)
+            StockReservation.objects.filter(id__in=[row[0] for row in batch]).delete()
+        released += len(batch)
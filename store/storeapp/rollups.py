@@ -0,0 +1,235 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, ExpressionWrapper, F, OuterRef, Sum, Value, When
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedSellerOrder, DailyProductSales, DailySellerSales, Order, OrderItem,
+    OrderStatus, SellerOrder,
+)
+
+# --- Daily sales rollups ---
+#
+# Reports read DailyProductSales / DailySellerSales instead of scanning
+# OrderItem. Checkout adds the order's lines to its day with F() increments,
+# four statements however busy the day has been. refresh_day() rebuilds a
+# day from the source items and is what the backfill_sales_rollups command
+# uses for backfills and repairs. Archived orders (archive.py) are read
+# alongside the live ones, so a rebuild after archiving gives the same
+# totals.
+#
+# The figures are net sales: lines of a cancelled seller order don't count.
+#
+# Anything cached from the rollups (see trends.py) lives under the "sales"
+# version, which is bumped once the order's transaction commits.
+
+SALES_NAMESPACE = 'sales'
+
+
+def invalidate_sales():
+    bump_version(SALES_NAMESPACE)
+
+
+def day_bounds(day):
+    """[start, end) datetimes covering a local calendar day."""
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+# Order line model and the seller order model that says whether the line was cancelled
+ITEM_SOURCES = [(OrderItem, SellerOrder), (ArchivedOrderItem, ArchivedSellerOrder)]
+
+
+def sold_items(item_model, seller_order_model):
+    """Order lines of `item_model` whose seller order hasn't been cancelled."""
+    cancelled = seller_order_model.objects.filter(
+        order=OuterRef('order_id'), seller=OuterRef('product__seller_id'), status=OrderStatus.CANCELLED,
+    )
+    return item_model.objects.exclude(Exists(cancelled))
+
+
+def refresh_day(day, product_ids=None):
+    """Rebuild the rollups for `day`, for all products or just `product_ids`."""
+    start, end = day_bounds(day)
+    existing = DailyProductSales.objects.filter(date=day)
+    if product_ids is not None:
+        existing = existing.filter(product_id__in=product_ids)
+
+    sales = {}
+    for item_model, seller_order_model in ITEM_SOURCES:
+        items = sold_items(item_model, seller_order_model).filter(
+            order__created_at__gte=start, order__created_at__lt=end,
+        )
+        if product_ids is not None:
+            items = items.filter(product_id__in=product_ids)
+        totals = items.values('product_id', 'product__seller_id').annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('price') * F('quantity')),
+            cost=Sum(F('cost_price') * F('quantity')),
+        )
+        for row in totals:
+            product = sales.get(row['product_id'])
+            if product is None:
+                sales[row['product_id']] = DailyProductSales(
+                    date=day, product_id=row['product_id'], seller_id=row['product__seller_id'],
+                    units=row['units'], revenue=row['revenue'], cost=row['cost'],
+                )
+            else:
+                product.units += row['units']
+                product.revenue += row['revenue']
+                product.cost += row['cost']
+    rows = list(sales.values())
+    existing.exclude(product_id__in=[row.product_id for row in rows]).delete()
+    DailyProductSales.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['date', 'product'],
+        update_fields=['seller', 'units', 'revenue', 'cost'],
+    )
+    refresh_seller_day(day, None if product_ids is None else {row.seller_id for row in rows})
+
+
+def refresh_seller_day(day, seller_ids=None):
+    """Re-sum the seller rollups for `day` from the product rollups."""
+    product_rows = DailyProductSales.objects.filter(date=day)
+    existing = DailySellerSales.objects.filter(date=day)
+    if seller_ids is not None:
+        product_rows = product_rows.filter(seller_id__in=seller_ids)
+        existing = existing.filter(seller_id__in=seller_ids)
+
+    totals = product_rows.values('seller_id').annotate(
+        total_units=Sum('units'), total_revenue=Sum('revenue'), total_cost=Sum('cost'),
+    )
+    rows = [
+        DailySellerSales(
+            date=day, seller_id=row['seller_id'],
+            units=row['total_units'], revenue=row['total_revenue'], cost=row['total_cost'],
+        )
+        for row in totals
+    ]
+    existing.exclude(seller_id__in=[row.seller_id for row in rows]).delete()
+    DailySellerSales.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['date', 'seller'],
+        update_fields=['units', 'revenue', 'cost'],
+    )
+
+
+def _increment(model, key, day, deltas):
+    """Add {key id: (units, revenue, cost, extra fields)} to the day's `model` rows in two statements."""
+    model.objects.bulk_create(
+        [model(date=day, **{f'{key}_id': key_id}, **extra) for key_id, (*_, extra) in deltas.items()],
+        ignore_conflicts=True,
+    )
+
+    def per_row(index, field):
+        return Case(
+            *[When(**{f'{key}_id': key_id}, then=Value(values[index])) for key_id, values in deltas.items()],
+            output_field=model._meta.get_field(field),
+        )
+
+    model.objects.filter(date=day, **{f'{key}_id__in': list(deltas)}).update(
+        units=F('units') + per_row(0, 'units'),
+        revenue=F('revenue') + per_row(1, 'revenue'),
+        cost=F('cost') + per_row(2, 'cost'),
+    )
+
+
+def add_sales(day, lines, sign=1):
+    """Add order lines to the rollups for `day`, or take them away with sign=-1.
+
+    `lines` are (product_id, seller_id, quantity, price, cost_price) tuples.
+    """
+    products, sellers = {}, {}
+    for product_id, seller_id, quantity, price, cost_price in lines:
+        for totals, key_id, extra in ((products, product_id, {'seller_id': seller_id}), (sellers, seller_id, {})):
+            units, revenue, cost, _ = totals.get(key_id, (0, 0, 0, extra))
+            totals[key_id] = (
+                units + sign * quantity, revenue + sign * quantity * price, cost + sign * quantity * cost_price, extra,
+            )
+    if not products:
+        return
+    _increment(DailyProductSales, 'product', day, products)
+    _increment(DailySellerSales, 'seller', day, sellers)
+    if sign < 0:
+        DailyProductSales.objects.filter(date=day, product_id__in=list(products), units=0).delete()
+        DailySellerSales.objects.filter(date=day, seller_id__in=list(sellers), units=0).delete()
+
+
+def record_order(order, order_items):
+    """Fold a just-placed order's lines into its day's rollups. Call inside the order's transaction."""
+    add_sales(timezone.localdate(order.created_at), [
+        (item.product_id, item.product.seller_id, item.quantity, item.price, item.cost_price)
+        for item in order_items
+    ])
+    transaction.on_commit(invalidate_sales)
+
+
+def record_cancellation(lines_by_day):
+    """Take cancelled order lines, {day: lines}, back out of the rollups. Call inside the cancelling transaction."""
+    for day, lines in lines_by_day.items():
+        add_sales(day, lines, sign=-1)
+    transaction.on_commit(invalidate_sales)
+
+
+def order_days(start=None, end=None):
+    """Distinct local days that have orders, live or archived, optionally limited to [start, end]."""
+    days = set()
+    for model in (Order, ArchivedOrder):
+        orders = model.objects.all()
+        if start:
+            orders = orders.filter(created_at__gte=day_bounds(start)[0])
+        if end:
+            orders = orders.filter(created_at__lt=day_bounds(end)[1])
+        days.update(value.date() for value in orders.datetimes('created_at', 'day'))
+    return sorted(days)
+
+
+def _with_profit(rows):
+    return rows.annotate(
+        total_quantity_sold=Sum('units'),
+        total_revenue=Sum('revenue'),
+        total_cost=Sum('cost'),
+    ).annotate(
+        total_profit=ExpressionWrapper(F('total_revenue') - F('total_cost'), output_field=DecimalField())
+    ).order_by('-total_profit')
+
+
+def product_sales(start, end):
+    """Per-product units, revenue and profit for the dates [start, end], best first."""
+    return _with_profit(
+        DailyProductSales.objects.filter(date__range=(start, end))
+        .values('product_id', 'product__product_name', 'product__seller__name')
+    )
+
+
+def seller_sales(start, end):
+    """Per-seller units, revenue and profit for the dates [start, end], best first."""
+    return _with_profit(
+        DailySellerSales.objects.filter(date__range=(start, end)).values('seller_id', 'seller__name')
+    )
+
+
+def sales_totals(start, end):
+    """Revenue, profit and units sold over the dates [start, end]."""
+    totals = DailyProductSales.objects.filter(date__range=(start, end)).aggregate(
+        units=Sum('units'), revenue=Sum('revenue'), cost=Sum('cost'),
+    )
+    total_sales = totals['revenue'] or 0
+    return {
+        'total_sales': total_sales,
+        'total_profit': total_sales - (totals['cost'] or 0),
+        'total_products_sold': totals['units'] or 0,
+    }
+
+
+def sales_report(start, end):
+    """Totals plus product-wise and seller-wise sales for the dates [start, end]."""
+    return {
+        **sales_totals(start, end),
+        'product_sales': product_sales(start, end),
+        'seller_sales': seller_sales(start, end),
+    }
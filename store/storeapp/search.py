@@ -0,0 +1,129 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# --- Product full-text search ---
+#
+# On SQLite the catalog is indexed by an FTS5 "external content" table that
+# mirrors Product.product_name, description and category. Triggers on the
+# product table keep it in sync for every write path (ORM saves, bulk
+# updates, cascading deletes), so the views only ever read from it.
+# Searches join the index to the product query itself, so the caller's
+# filters and the BM25 ranking run in one statement over every match.
+
+FTS_TABLE = 'storeapp_product_fts'
+PRODUCT_TABLE = 'storeapp_product'
+INDEXED_COLUMNS = ('product_name', 'description', 'category')
+
+# bm25() weights, in INDEXED_COLUMNS order: a hit in the name counts most.
+COLUMN_WEIGHTS = (10.0, 2.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _columns(prefix=''):
+    return ', '.join(prefix + column for column in INDEXED_COLUMNS)
+
+
+def _trigger_sql():
+    new_row = f"new.id, {_columns('new.')}"
+    old_row = f"'delete', old.id, {_columns('old.')}"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {_columns()}) VALUES ({new_row});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns()}) VALUES ({old_row});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns()} ON {PRODUCT_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns()}) VALUES ({old_row});
+            INSERT INTO {FTS_TABLE}(rowid, {_columns()}) VALUES ({new_row});
+        END""",
+    ]
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def install_search_index(conn=None):
+    """Create the FTS table and its sync triggers if they are missing."""
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        existing = conn.introspection.table_names(cursor)
+        if PRODUCT_TABLE not in existing:
+            return
+        if FTS_TABLE not in existing:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{_columns()}, content='{PRODUCT_TABLE}', content_rowid='id', "
+                f"prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        for statement in _trigger_sql():
+            cursor.execute(statement)
+
+
+def restore_search_triggers(conn=None):
+    """Re-create the sync triggers for an existing index.
+
+    SQLite drops a table's triggers whenever a migration rebuilds it, so
+    this runs after every migrate.
+    """
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        if FTS_TABLE not in conn.introspection.table_names(cursor):
+            return
+        for statement in _trigger_sql():
+            cursor.execute(statement)
+
+
+def rebuild_search_index(conn=None):
+    """Re-read every product into the index."""
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    install_search_index(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(queryset, query):
+    """Restrict a Product queryset to `query` matches.
+
+    Filters applied to `queryset` before or after this call narrow the
+    matches in the same query. Matches are annotated with `search_rank`,
+    their BM25 score (lower is better), and ordered by it. Databases
+    without FTS5 fall back to an unranked substring match.
+    """
+    if not is_supported():
+        return queryset.filter(
+            Q(product_name__icontains=query)
+            | Q(description__icontains=query)
+            | Q(category__icontains=query)
+        ).annotate(search_rank=Value(0.0)).order_by('search_rank', 'id')
+
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    # bm25() only works on the row the MATCH produced, hence a join rather than a subquery
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {PRODUCT_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[expression],
+    ).annotate(
+        search_rank=RawSQL(f'bm25({FTS_TABLE}, {weights})', [], output_field=FloatField()),
+    ).order_by('search_rank', 'id')
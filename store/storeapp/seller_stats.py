@@ -0,0 +1,200 @@
+import datetime
+from decimal import Decimal
+
+from django.db.models import (
+    Case, Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Feedback, OrderStatus, Product, SellerOrder, SellerStats
+from .rollups import ITEM_SOURCES, day_bounds, sold_items
+
+# --- Seller KPI counters ---
+#
+# One SellerStats row per seller, so the dashboard never aggregates order
+# history on the fly. Lifetime totals are bumped with F() expressions at
+# checkout and taken back when a seller order is cancelled, so like the
+# sales rollups they are net of cancellations. The rolling window,
+# low-stock and feedback counts are re-derived for just the affected
+# sellers, one correlated UPDATE each. The reconcile_seller_stats command
+# rebuilds rows from the uncancelled OrderItems (live and archived),
+# Product and Feedback in batches and reports any drift from the running
+# totals. Archiving never touches the rolling window: archive.py only
+# moves orders older than it.
+
+RECENT_DAYS = 30
+LOW_STOCK_THRESHOLD = 5
+
+STAT_FIELDS = (
+    'revenue', 'units', 'orders', 'recent_revenue', 'recent_units', 'recent_orders',
+    'low_stock_products', 'feedback_count',
+)
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def recent_cutoff(today=None):
+    """Start of the rolling window that ends with `today`."""
+    today = today or timezone.localdate()
+    return day_bounds(today - datetime.timedelta(days=RECENT_DAYS - 1))[0]
+
+
+def record_order(seller_orders):
+    """Add the SellerOrder rows of a just-placed order to their sellers' stats."""
+    if not seller_orders:
+        return
+
+    def per_seller(attribute, output_field):
+        return Case(
+            *[When(seller_id=share.seller_id, then=Value(getattr(share, attribute))) for share in seller_orders],
+            output_field=output_field,
+        )
+
+    seller_ids = [share.seller_id for share in seller_orders]
+    SellerStats.objects.filter(seller_id__in=seller_ids).update(
+        revenue=F('revenue') + per_seller('subtotal', MONEY),
+        units=F('units') + per_seller('item_count', IntegerField()),
+        orders=F('orders') + 1,
+    )
+    refresh_recent(seller_ids)
+
+
+def record_cancellation(seller_orders):
+    """Take just-cancelled SellerOrder rows back out of their sellers' stats."""
+    totals = {}
+    for share in seller_orders:
+        revenue, units, orders = totals.get(share.seller_id, (0, 0, 0))
+        totals[share.seller_id] = (revenue + share.subtotal, units + share.item_count, orders + 1)
+    if not totals:
+        return
+
+    def per_seller(index, output_field):
+        return Case(
+            *[When(seller_id=seller_id, then=Value(values[index])) for seller_id, values in totals.items()],
+            output_field=output_field,
+        )
+
+    SellerStats.objects.filter(seller_id__in=list(totals)).update(
+        revenue=F('revenue') - per_seller(0, MONEY),
+        units=F('units') - per_seller(1, IntegerField()),
+        orders=F('orders') - per_seller(2, IntegerField()),
+    )
+    refresh_recent(list(totals))
+
+
+def refresh_recent(seller_ids, today=None):
+    """Recompute the rolling-window figures from the sellers' recent SellerOrder rows."""
+    today = today or timezone.localdate()
+    recent = (
+        SellerOrder.objects.filter(seller=OuterRef('seller_id'), created_at__gte=recent_cutoff(today))
+        .exclude(status=OrderStatus.CANCELLED)
+        .order_by().values('seller')
+    )
+
+    def total(aggregate, output_field):
+        return Coalesce(
+            Subquery(recent.annotate(total=aggregate).values('total')), Value(0), output_field=output_field,
+        )
+
+    SellerStats.objects.filter(seller_id__in=seller_ids).update(
+        recent_revenue=total(Sum('subtotal'), MONEY),
+        recent_units=total(Sum('item_count'), IntegerField()),
+        recent_orders=total(Count('id'), IntegerField()),
+        recent_as_of=today,
+    )
+
+
+def refresh_low_stock(seller_ids=None, product_ids=None):
+    """Recount low-stock products for `seller_ids`, or for the sellers of `product_ids`."""
+    stats = SellerStats.objects.all()
+    if seller_ids is not None:
+        stats = stats.filter(seller_id__in=seller_ids)
+    if product_ids is not None:
+        stats = stats.filter(seller_id__in=Product.objects.filter(id__in=product_ids).values('seller_id'))
+    low_stock = (
+        Product.objects.filter(seller=OuterRef('seller_id'), stock__lte=LOW_STOCK_THRESHOLD)
+        .order_by().values('seller').annotate(total=Count('id')).values('total')
+    )
+    stats.update(low_stock_products=Coalesce(Subquery(low_stock), Value(0)))
+
+
+def refresh_feedback(seller_id):
+    feedback = Feedback.objects.filter(seller=OuterRef('seller_id')).order_by().values('seller').annotate(
+        total=Count('id'),
+    ).values('total')
+    SellerStats.objects.filter(seller_id=seller_id).update(feedback_count=Coalesce(Subquery(feedback), Value(0)))
+
+
+def compute(seller_ids, today=None):
+    """{seller_id: {field: value}} for STAT_FIELDS, aggregated from the source tables."""
+    cutoff = recent_cutoff(today)
+    results = {
+        seller_id: {field: Decimal('0.00') if field.endswith('revenue') else 0 for field in STAT_FIELDS}
+        for seller_id in seller_ids
+    }
+    totals = {
+        'revenue': Sum(F('price') * F('quantity')),
+        'units': Sum('quantity'),
+        'orders': Count('order_id', distinct=True),
+    }
+    # An order lives in exactly one of the two tables, so their totals add up
+    for item_model, seller_order_model in ITEM_SOURCES:
+        items = (
+            sold_items(item_model, seller_order_model)
+            .filter(product__seller_id__in=seller_ids).values('product__seller_id').order_by()
+        )
+        for prefix, rows in (('', items), ('recent_', items.filter(order__created_at__gte=cutoff))):
+            for row in rows.annotate(**totals):
+                for field in totals:
+                    results[row['product__seller_id']][prefix + field] += row[field]
+
+    low_stock = Product.objects.filter(seller_id__in=seller_ids, stock__lte=LOW_STOCK_THRESHOLD)
+    for seller_id, count in low_stock.values('seller_id').annotate(total=Count('id')).values_list('seller_id', 'total'):
+        results[seller_id]['low_stock_products'] = count
+    feedback = Feedback.objects.filter(seller_id__in=seller_ids)
+    for seller_id, count in feedback.values('seller_id').annotate(total=Count('id')).values_list('seller_id', 'total'):
+        results[seller_id]['feedback_count'] = count
+    return results
+
+
+def reconcile(seller_ids, fix=True, today=None):
+    """Compare stored stats for `seller_ids` with the source tables.
+
+    Returns a list of (seller_id, field, stored, actual) for every value
+    that has drifted (a missing row counts as all zeros). With `fix`, the
+    rows are rewritten from the source in one upsert.
+    """
+    today = today or timezone.localdate()
+    actual = compute(seller_ids, today)
+    stored = {stats.seller_id: stats for stats in SellerStats.objects.filter(seller_id__in=seller_ids)}
+
+    drift = []
+    for seller_id, values in actual.items():
+        row = stored.get(seller_id)
+        for field in STAT_FIELDS:
+            current = getattr(row, field) if row else 0
+            if current != values[field]:
+                drift.append((seller_id, field, current, values[field]))
+
+    if fix:
+        SellerStats.objects.bulk_create(
+            [SellerStats(seller_id=seller_id, recent_as_of=today, **values) for seller_id, values in actual.items()],
+            update_conflicts=True,
+            unique_fields=['seller'],
+            update_fields=[*STAT_FIELDS, 'recent_as_of', 'updated_at'],
+        )
+    return drift
+
+
+def for_seller(seller_id):
+    """The seller's stats, built from source if missing and with the rolling window brought up to date."""
+    today = timezone.localdate()
+    stats = SellerStats.objects.filter(seller_id=seller_id).first()
+    if stats is None:
+        reconcile([seller_id], today=today)
+        stats = SellerStats.objects.get(seller_id=seller_id)
+    elif stats.recent_as_of != today:
+        refresh_recent([seller_id], today)
+        stats.refresh_from_db()
+    return stats
@@ -0,0 +1,61 @@
+from django.db import connections
+
+from . import facets, images, media_refs, principals, search, seller_stats
+from .models import SellerStats
+
+
+def restore_search_triggers(sender, using='default', **kwargs):
+    """Re-create the product search triggers once migrations have run."""
+    search.restore_search_triggers(connections[using])
+
+
+def catalog_changed(sender, **kwargs):
+    """A product or seller changed: cached catalog facets are stale."""
+    facets.invalidate_catalog()
+
+
+def principal_changed(sender, instance, **kwargs):
+    """A customer or seller was edited, approved or deleted: drop their cached principal."""
+    principals.invalidate_principal(sender._meta.model_name, instance.pk)
+
+
+def seller_saved(sender, instance, created, **kwargs):
+    """Give every new seller an (empty) stats row to count into."""
+    if created:
+        SellerStats.objects.get_or_create(seller=instance)
+
+
+def product_stock_changed(sender, instance, **kwargs):
+    """A product was added, edited or removed: its seller's low-stock count may have moved."""
+    seller_stats.refresh_low_stock(seller_ids=[instance.seller_id])
+
+
+def feedback_changed(sender, instance, **kwargs):
+    seller_stats.refresh_feedback(instance.seller_id)
+
+
+def image_changing(sender, instance, update_fields=None, **kwargs):
+    """Note which file an edited row pointed at, so its reference can be released."""
+    field = dict(images.IMAGE_FIELDS)[sender]
+    if instance._state.adding or (update_fields is not None and field not in update_fields):
+        instance._previous_image = None
+    else:
+        instance._previous_image = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    """Count the reference to a newly set picture and queue its resized variants (if it gets any)."""
+    field = dict(images.IMAGE_FIELDS)[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    name = getattr(instance, field).name or ''
+    previous = getattr(instance, '_previous_image', None) or ''
+    if name != previous:
+        media_refs.change(added=[name], removed=[previous])
+    if name and (sender, field) in images.VARIANT_FIELDS and not images.has_variants(name):
+        images.schedule_variants(name)
+
+
+def image_deleted(sender, instance, **kwargs):
+    field = dict(images.IMAGE_FIELDS)[sender]
+    media_refs.change(removed=[getattr(instance, field).name])
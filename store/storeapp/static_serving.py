@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import posixpath
+import re
+from collections import namedtuple
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+from .images import is_variant, original_name
+from .storage import is_content_addressed
+
+# --- Static and media file serving ---
+#
+# A WSGI wrapper around the Django application (see store/wsgi.py) that
+# answers GET/HEAD requests under STATIC_URL and MEDIA_URL straight from
+# disk, before any middleware runs. When the browser accepts it, the .br or
+# .gz copy collectstatic wrote is sent instead of the file itself. Names
+# that carry a content hash never change meaning, so they are sent with a
+# one-year immutable Cache-Control: collectstatic's app.3f2a9c1b7e4d.css and
+# the content-addressed media uploads with their variants. Other files must
+# be revalidated, which the ETag/Last-Modified headers make a cheap 304.
+# Anything not found on disk is passed on to Django.
+
+HASHED_STATIC_NAME = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+# (Content-Encoding, file suffix) in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+CHUNK_SIZE = 64 * 1024
+
+# URL prefix ('/static/'), folder it maps to, and a test for names that can be cached forever
+Mount = namedtuple('Mount', ['prefix', 'root', 'is_immutable'])
+
+
+def is_hashed_static(name):
+    return bool(HASHED_STATIC_NAME.search(name))
+
+
+def is_immutable_media(name):
+    return is_content_addressed(original_name(name) if is_variant(name) else name)
+
+
+def default_mounts():
+    """The STATIC_ROOT and MEDIA_ROOT mounts, leaving out any that isn't configured."""
+    mounts = []
+    for url, root, is_immutable in (
+        (settings.STATIC_URL, settings.STATIC_ROOT, is_hashed_static),
+        (settings.MEDIA_URL, settings.MEDIA_ROOT, is_immutable_media),
+    ):
+        if url and root and '://' not in url:
+            mounts.append(Mount('/' + url.strip('/') + '/', str(root), is_immutable))
+    return mounts
+
+
+def accepted_encodings(header):
+    """The content codings the Accept-Encoding `header` allows (not refused with q=0)."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesApplication:
+    """Serve the files under `mounts` (default: static and media) and pass other requests to `application`."""
+
+    def __init__(self, application, mounts=None):
+        self.application = application
+        self.mounts = default_mounts() if mounts is None else mounts
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            found = self.find(environ.get('PATH_INFO', '/'))
+            if found is not None:
+                return self.serve(environ, start_response, *found)
+        return self.application(environ, start_response)
+
+    def find(self, path):
+        """(mount, name, full path) for the file `path` asks for, or None."""
+        # WSGI hands over the decoded path as latin-1; file names are UTF-8
+        path = path.encode('iso-8859-1').decode('utf-8', 'replace')
+        for mount in self.mounts:
+            if not path.startswith(mount.prefix):
+                continue
+            name = path[len(mount.prefix):]
+            if not name:
+                return None
+            try:
+                full_path = safe_join(mount.root, *name.split('/'))
+            except SuspiciousFileOperation:
+                return None
+            if os.path.isfile(full_path):
+                return mount, posixpath.normpath(name), full_path
+            return None
+        return None
+
+    def serve(self, environ, start_response, mount, name, path):
+        content_type, _ = mimetypes.guess_type(name)
+        headers = [('Content-Type', content_type or 'application/octet-stream')]
+
+        variants = [(coding, path + suffix) for coding, suffix in ENCODINGS if os.path.isfile(path + suffix)]
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        coding, body_path = next(((coding, file) for coding, file in variants if coding in accepted), (None, path))
+        if variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if coding:
+            headers.append(('Content-Encoding', coding))
+
+        stat = os.stat(body_path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}{"-" + coding if coding else ""}"'
+        headers += [
+            ('Cache-Control', IMMUTABLE if mount.is_immutable(name) else REVALIDATE),
+            ('ETag', etag),
+            ('Last-Modified', http_date(stat.st_mtime)),
+        ]
+
+        if self.not_modified(environ, etag, stat.st_mtime):
+            start_response('304 Not Modified', headers)
+            return []
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(body_path, 'rb'), CHUNK_SIZE)
+
+    def not_modified(self, environ, etag, mtime):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        since = parse_http_date_safe(environ.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return since is not None and int(mtime) <= since
@@ -0,0 +1,68 @@
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Product
+from .seller_stats import refresh_low_stock
+
+# --- Set-based stock adjustments ---
+#
+# Each helper touches any number of products with one UPDATE, using a CASE
+# on the product id to apply a different quantity per row. The sellers'
+# low-stock counters are refreshed in the same transaction.
+
+
+class OutOfStockError(Exception):
+    """Raised when a cart asks for more units than are left in stock."""
+
+    def __init__(self, products):
+        self.products = products
+        super().__init__(', '.join(product.product_name for product in products))
+
+
+def _per_product(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def decrement_stock(quantities):
+    """Take {product_id: quantity} out of stock in a single UPDATE.
+
+    Rows are only touched if every product has enough stock left; otherwise
+    OutOfStockError is raised and the surrounding transaction rolls back.
+    """
+    if not quantities:
+        return
+    wanted = _per_product(quantities)
+    updated = Product.objects.filter(id__in=quantities, stock__gte=wanted).update(stock=F('stock') - wanted)
+    if updated != len(quantities):
+        short = Product.objects.filter(id__in=quantities).exclude(stock__gte=wanted)
+        raise OutOfStockError(list(short))
+    refresh_low_stock(product_ids=list(quantities))
+
+
+def increment_stock(quantities):
+    """Put {product_id: quantity} back into stock in a single UPDATE."""
+    if not quantities:
+        return
+    Product.objects.filter(id__in=quantities).update(stock=F('stock') + _per_product(quantities))
+    refresh_low_stock(product_ids=list(quantities))
+
+
+def apply_stock_changes(deltas):
+    """Apply {product_id: units to take (positive) or return (negative)}."""
+    decrement_stock({product_id: delta for product_id, delta in deltas.items() if delta > 0})
+    increment_stock({product_id: -delta for product_id, delta in deltas.items() if delta < 0})
+
+
+def adjust_stock(deltas):
+    """Move {product_id: units} up or down by a seller's edit in a single UPDATE, stopping at zero.
+
+    Sellers' forms send the stock they were shown along with the new
+    figure; applying the difference keeps units sold or held since then.
+    """
+    if not deltas:
+        return
+    Product.objects.filter(id__in=deltas).update(stock=Greatest(F('stock') + _per_product(deltas), Value(0)))
+    refresh_low_stock(product_ids=list(deltas))
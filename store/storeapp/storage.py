@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # collectstatic then writes gzip copies only
+    brotli = None
+
+# --- Content-addressed media storage ---
+#
+# Uploads are saved under the SHA-256 of their bytes inside their upload_to
+# folder, e.g. product_photos/3f/3fa2…e9.png, so the same picture uploaded
+# twice is stored once and shares one set of resized variants. Names never
+# change once written, which makes the files safe to cache forever. Which
+# rows point at which file is counted in StoredFile (see media_refs.py).
+
+HASHED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.[a-z0-9]+)?$')
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names each file after the hash of its content."""
+
+    def __init__(self, **kwargs):
+        # Two uploads can only race for a name if their bytes are identical
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def hashed_name(self, name, content):
+        """Where `content`, uploaded as `name`, is stored."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Reusing a file restarts the media clean-up's grace period for it
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+_media_storage = None
+
+
+def media_storage():
+    """Storage for the ImageFields in storeapp.models (a callable so migrations don't pin it)."""
+    global _media_storage
+    if _media_storage is None:
+        _media_storage = ContentAddressedStorage()
+    return _media_storage
+
+
+# --- Precompressed static files ---
+#
+# collectstatic already writes a content-hashed copy of every static file
+# (app.css -> app.3f2a9c1b7e4d.css). This storage also writes name.gz and,
+# when the brotli package is installed, name.br next to each text file, so
+# the server never compresses on the fly; storeapp/static_serving.py picks
+# whichever the browser accepts. A copy that doesn't save at least 5% is
+# not kept. Images and woff2 fonts are compressed already and are skipped.
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.json', '.webmanifest', '.map', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf',
+}
+COMPRESS_MIN_BYTES = 256
+
+
+def compress(data):
+    """[(extension, compressed bytes)] worth storing for `data`."""
+    encoded = []
+    if brotli is not None:
+        encoded.append(('.br', brotli.compress(data, quality=11)))
+    encoded.append(('.gz', gzip.compress(data, compresslevel=9, mtime=0)))
+    return [(extension, body) for extension, body in encoded if len(body) < len(data) * 0.95]
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also stores .br/.gz copies of the files it collects."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Unhashed names are collected too and may be linked directly (manifest.json's icons)
+        names = {*paths, *self.hashed_files.values()}
+        for name in sorted(names):
+            if posixpath.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS or not self.exists(name):
+                continue
+            with self.open(name) as original:
+                data = original.read()
+            if len(data) < COMPRESS_MIN_BYTES:
+                continue
+            for extension, body in compress(data):
+                if self.exists(name + extension):
+                    self.delete(name + extension)
+                self._save(name + extension, ContentFile(body))
+                yield name, name + extension, True
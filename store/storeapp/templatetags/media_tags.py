@@ -0,0 +1,36 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from storeapp import images
+
+register = template.Library()
+
+
+def _srcset(name, extension):
+    return ', '.join(
+        f'{default_storage.url(images.variant_name(name, width, extension))} {width}w'
+        for width in images.VARIANT_WIDTHS
+    )
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class='', loading='lazy'):
+    """<picture> with WebP and JPEG srcsets for an image field, or a plain <img> until its variants exist.
+
+    `sizes` should say how wide the image is drawn, e.g. "64px" for a
+    thumbnail, so the browser can pick the smallest variant that fits.
+    """
+    if not image:
+        return ''
+    if not images.has_variants(image.name):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">', image.url, alt, css_class, loading,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        _srcset(image.name, 'webp'), sizes,
+        default_storage.url(images.variant_name(image.name, images.VARIANT_WIDTHS[1], 'jpg')),
+        _srcset(image.name, 'jpg'), sizes, alt, css_class, loading,
+    )
@@ -1,3 +1,1309 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import importlib
+import io
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    archive, assets, exports, facets, feed, fulfilment, images, media_gc, product_import, reservations, rollups, search,
+    seller_stats, static_serving, storage, trends, views,
+)
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusChange, CartItem, CommunityPost, Customer, DailyProductSales,
+    DailySellerSales, Order, OrderItem, OrderStatus, OrderStatusChange, PendingVariant, Product, Seller, SellerOrder,
+    SellerStats, StockReservation, StoredFile,
+)
+from .cache_backends import FileCache
+from .caching import bump_version, get_version, versioned_key
+from .cart import get_cart_summary, invalidate_cart
+from .orders import CheckoutConflictError, OutOfStockError, place_order
+from .pagination import KeysetPaginator
+from .principals import ANONYMOUS, Principal, get_principal
 
 # Create your tests here.
+
+SHIPPING = {
+    'first_name': 'Anu', 'last_name': 'K', 'address': 'Main Road', 'city': 'Thrissur',
+    'state': 'Kerala', 'zip_code': '680001', 'email': 'anu@example.com', 'phone': '9000000000',
+}
+
+
+# Rendering pages doesn't need collectstatic to have been run, and tests
+# keep their cache in memory rather than in the site's cache folder
+test_settings = override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+
+
+@test_settings
+class StoreTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = Seller.objects.create(
+            name='Unit 1', username='unit1', password='x', address='x', email='unit1@example.com',
+            phone='1', kudumbasree_details='NHG', passbook='p.png', is_approved=True,
+        )
+        self.customer = Customer.objects.create(
+            name='Anu', username='anu', password='x', address='x', email='anu@example.com',
+            phone='1', age=30, photo='c.png',
+        )
+
+    def login_as(self, user_type, user_id=None):
+        session = self.client.session
+        session['user_type'], session['user_id'] = user_type, user_id
+        session.save()
+
+    def fill_cart(self, lines, quantity=2, stock=10):
+        for i in range(lines):
+            product = Product.objects.create(
+                seller=self.seller, product_name=f'Item {i}', description='d',
+                price=100, cost_price=60, stock=stock, photo='p.png',
+            )
+            CartItem.objects.create(customer=self.customer, product=product, quantity=quantity)
+
+
+class ProductSearchTests(StoreTestCase):
+    def add(self, name, description='d', **fields):
+        return Product.objects.create(
+            seller=self.seller, product_name=name, description=description, price=fields.pop('price', 100),
+            cost_price=60, stock=5, photo='p.png', **fields,
+        )
+
+    def test_name_hits_rank_above_description_hits(self):
+        described = self.add('Jar', 'Mango pickle in a jar')
+        named = self.add('Mango pickle')
+        self.add('Banana chips')
+
+        results = search.search_products(Product.objects.all(), 'mango')
+        self.assertEqual([product.id for product in results], [named.id, described.id])
+        self.assertEqual(list(search.search_products(Product.objects.all(), 'man pick')), [named, described])
+
+        # The BM25 score works as a keyset sort key
+        paginator = KeysetPaginator(results, 1, ('search_rank', 'id'))
+        first = paginator.get_page()
+        self.assertEqual(list(paginator.get_page(first.next_cursor)), [described])
+
+    def test_filters_apply_to_every_match(self):
+        # Hidden and dearer products rank higher but must not crowd out the rest
+        hidden = [self.add(f'Soap {i}', 'soap soap soap', price=500) for i in range(5)]
+        Product.objects.filter(id__in=[product.id for product in hidden]).update(is_visible=False)
+        cheap = [self.add(f'Soap bar {i}', 'herbal', price=50, category='Soaps') for i in range(3)]
+        self.add('Soap dish', 'steel', price=50, category='Kitchen')
+
+        visible = Product.objects.filter(is_visible=True)
+        results = search.search_products(visible, 'soap').filter(category='Soaps', price__lte=100)
+        self.assertEqual({product.id for product in results}, {product.id for product in cheap})
+        self.assertEqual(search.search_products(visible, 'soap').count(), 4)
+
+        response = self.client.get(reverse('products'), {'q': 'soap', 'category': 'Soaps'})
+        self.assertEqual(response.context['total_count'], 3)
+        self.assertEqual({category['name'] for category in response.context['categories']}, {'Soaps', 'Kitchen'})
+
+    def test_substring_fallback_without_fts(self):
+        pickle = self.add('Mango pickle')
+        self.add('Banana chips')
+        with mock.patch.object(search, 'is_supported', return_value=False):
+            results = list(search.search_products(Product.objects.all(), 'ngo pic'))
+        self.assertEqual(results, [pickle])
+        self.assertEqual(results[0].search_rank, 0)
+
+
+class KeysetPaginatorTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        # Prices repeat so the id tie-breaker matters
+        self.products = [
+            Product.objects.create(
+                seller=self.seller, product_name=f'Item {i}', description='d',
+                price=10 * (i % 4), cost_price=1, stock=i, photo='p.png',
+            )
+            for i in range(10)
+        ]
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_and_back_cover_every_row_once(self):
+        paginator = KeysetPaginator(Product.objects.all(), 3, ('-price', '-id'))
+        pages = self.walk(paginator)
+        expected = list(Product.objects.order_by('-price', '-id'))
+        self.assertEqual([product for page in pages for product in page], expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        self.assertEqual(list(paginator.get_page(back.previous_cursor)), list(pages[0]))
+        self.assertFalse(paginator.get_page(back.previous_cursor).has_previous)
+
+    def test_aggregate_sort_keys(self):
+        totals = Product.objects.values('price').annotate(total=Sum('stock'))
+        paginator = KeysetPaginator(totals, 2, ('-total', 'price'))
+        rows = [row for page in self.walk(paginator) for row in page]
+        self.assertEqual(rows, list(totals.order_by('-total', 'price')))
+
+    def test_tampered_or_foreign_cursors_fall_back_to_the_first_page(self):
+        by_price = KeysetPaginator(Product.objects.all(), 3, ('price', 'id'))
+        by_price_desc = KeysetPaginator(Product.objects.all(), 3, ('-price', '-id'))
+        cursor = by_price.get_page().next_cursor
+        first = list(by_price_desc.get_page())
+
+        self.assertEqual(list(by_price_desc.get_page(cursor)), first)
+        self.assertEqual(list(by_price.get_page(cursor[:-2] + 'xx')), list(by_price.get_page()))
+        self.assertEqual(list(by_price.get_page('not-a-cursor')), list(by_price.get_page()))
+
+
+class CatalogVisibilityTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pending = Seller.objects.create(
+            name='Unit 2', username='unit2', password='x', address='x', email='unit2@example.com',
+            phone='2', kudumbasree_details='NHG', passbook='p.png',
+        )
+        self.product = Product.objects.create(
+            seller=self.pending, product_name='Pickle', description='d', price=50, stock=5, photo='p.png',
+        )
+
+    def test_approval_flips_product_visibility(self):
+        self.assertFalse(self.product.is_visible)
+
+        self.client.get(reverse('approve_seller', args=[self.pending.id]))
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.is_visible)
+        self.assertIn(self.product, Product.objects.filter(is_visible=True))
+
+        self.pending.is_approved = False
+        self.pending.save()
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.is_visible)
+
+    def test_backfill_copies_seller_approval(self):
+        approved = Product.objects.create(
+            seller=self.seller, product_name='Soap', description='d', price=50, stock=5, photo='p.png',
+        )
+        Product.objects.update(is_visible=False)
+
+        migration = importlib.import_module('storeapp.migrations.0017_product_is_visible')
+        migration.backfill_is_visible(django_apps, None)
+        self.assertEqual(
+            set(Product.objects.filter(is_visible=True).values_list('id', flat=True)), {approved.id},
+        )
+
+
+class CatalogFacetTests(StoreTestCase):
+    def add(self, category, price):
+        return Product.objects.create(
+            seller=self.seller, product_name='P', description='d', price=price, stock=5, category=category,
+            photo='p.png',
+        )
+
+    def test_counts_and_histogram(self):
+        self.add('Pickles', 100)
+        self.add('Pickles', 300)
+        self.add('Soaps', 5000)
+
+        result = facets.compute_facets(Product.objects.all())
+        self.assertEqual(result['categories'], [{'name': 'Pickles', 'count': 2}, {'name': 'Soaps', 'count': 1}])
+        counts = [bucket['count'] for bucket in result['price_histogram']]
+        self.assertEqual(counts[:2], [1, 1])
+        self.assertEqual(counts[-1], 1)  # above the slider range
+        self.assertEqual(max(bucket['percent'] for bucket in result['price_histogram']), 100)
+
+    def test_product_changes_invalidate_cached_facets(self):
+        self.add('Pickles', 100)
+        self.assertEqual(facets.catalog_facets()['categories'], [{'name': 'Pickles', 'count': 1}])
+        self.add('Soaps', 100)
+        self.assertEqual(len(facets.catalog_facets()['categories']), 2)
+
+    def test_invalidation_reaches_other_workers(self):
+        with tempfile.TemporaryDirectory() as location:
+            config = {'BACKEND': 'storeapp.cache_backends.FileCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': config}):
+                # Another process with the same CACHES setting
+                other_worker = FileCache(location, {})
+                self.add('Pickles', 100)
+                facets.catalog_facets()
+                key = versioned_key(facets.CATALOG_NAMESPACE, 'facets')
+                self.assertIsNotNone(other_worker.get(key))
+
+                facets.invalidate_catalog()
+                self.assertEqual(
+                    other_worker.get(f'version:{facets.CATALOG_NAMESPACE}'), get_version(facets.CATALOG_NAMESPACE),
+                )
+                self.assertNotEqual(versioned_key(facets.CATALOG_NAMESPACE, 'facets'), key)
+
+    def test_bumps_do_not_read_the_old_version(self):
+        before = get_version(facets.CATALOG_NAMESPACE)
+        # Two workers bumping at once each write their own new version; neither can undo the other
+        with mock.patch.object(cache, 'incr', side_effect=AssertionError), \
+                mock.patch.object(cache, 'get', side_effect=AssertionError):
+            first, second = bump_version(facets.CATALOG_NAMESPACE), bump_version(facets.CATALOG_NAMESPACE)
+        self.assertNotIn(before, (first, second))
+        self.assertIn(get_version(facets.CATALOG_NAMESPACE), (first, second))
+
+    def test_file_cache_counts_its_entries_every_few_writes(self):
+        with tempfile.TemporaryDirectory() as location:
+            file_cache = FileCache(location, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_EVERY': 5}})
+            with mock.patch.object(file_cache, '_list_cache_files', wraps=file_cache._list_cache_files) as listing:
+                for i in range(30):
+                    file_cache.set(f'key{i}', i)
+            self.assertEqual(listing.call_count, 6)
+            self.assertLessEqual(len(file_cache._list_cache_files()), 10 + 5)
+
+
+class PrincipalTests(StoreTestCase):
+    def request_for(self, user_type, user_id):
+        request = RequestFactory().get('/')
+        request.session = {'user_type': user_type, 'user_id': user_id}
+        return request
+
+    def test_loading_the_user_costs_one_query_and_fills_the_cache(self):
+        cache.clear()
+        request = self.request_for('customer', self.customer.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(views.get_logged_in_user(request), ('customer', self.customer))
+            self.assertEqual(views.get_customer_id(request), self.customer.id)
+        # Later requests that only need the id are served from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(views.get_customer_id(self.request_for('customer', self.customer.id)), self.customer.id)
+
+    def test_deleted_and_anonymous_users(self):
+        seller_id = self.seller.id
+        request = self.request_for('seller', seller_id)
+        self.assertEqual(get_principal(request), Principal('seller', seller_id))
+        self.seller.delete()
+        self.assertEqual(get_principal(request), ANONYMOUS)
+        self.assertEqual(views.get_logged_in_user(self.request_for('seller', seller_id)), (None, None))
+        self.assertEqual(get_principal(self.request_for(None, None)), ANONYMOUS)
+        self.assertEqual(views.get_logged_in_user(self.request_for('admin', None)), ('admin', None))
+
+
+class CartSummaryTests(StoreTestCase):
+    def test_summary_follows_cart_and_price_changes(self):
+        self.fill_cart(2, quantity=3)
+        summary = get_cart_summary(self.customer.id)
+        self.assertEqual(summary['item_count'], 6)
+        self.assertEqual(summary['subtotal'], 600)
+        self.assertEqual(sorted(summary['product_ids']), sorted(CartItem.objects.values_list('product_id', flat=True)))
+
+        CartItem.objects.filter(customer=self.customer).update(quantity=1)
+        invalidate_cart(self.customer.id)
+        self.assertEqual(get_cart_summary(self.customer.id)['item_count'], 2)
+
+        product = Product.objects.first()
+        product.price = 150
+        product.save()
+        self.assertEqual(get_cart_summary(self.customer.id)['subtotal'], 250)
+
+    def test_anonymous_summaries_are_independent(self):
+        summary = get_cart_summary(None)
+        summary['product_ids'].append(1)
+        summary['item_count'] = 5
+        self.assertEqual(get_cart_summary(None), {'item_count': 0, 'product_ids': [], 'subtotal': 0})
+
+
+class CheckoutTests(StoreTestCase):
+    def checkout_queries(self, lines):
+        CartItem.objects.all().delete()
+        self.fill_cart(lines)
+        with CaptureQueriesContext(connection) as queries:
+            place_order(self.customer, SHIPPING, f'pay_{lines}')
+        return len(queries)
+
+    def test_statement_count_does_not_grow_with_cart_size(self):
+        self.assertEqual(self.checkout_queries(1), self.checkout_queries(25))
+
+    def test_order_items_and_stock(self):
+        self.fill_cart(3, quantity=4)
+        order, created = place_order(self.customer, SHIPPING, 'pay_1')
+
+        self.assertEqual(order.total_price, 3 * 4 * 100 + 50)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 3)
+        self.assertEqual(set(Product.objects.values_list('stock', flat=True)), {6})
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_resubmitted_checkout_returns_the_same_order(self):
+        self.fill_cart(2)
+        order, created = place_order(self.customer, SHIPPING, 'pay_1', idempotency_key='k1')
+        self.fill_cart(1)
+
+        with self.assertNumQueries(2):
+            again, created_again = place_order(self.customer, SHIPPING, 'pay_1', idempotency_key='k1')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again, order)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_oversell_rolls_back(self):
+        self.fill_cart(2, quantity=3)
+        Product.objects.filter(product_name='Item 1').update(stock=2)
+
+        with self.assertRaises(OutOfStockError) as raised:
+            place_order(self.customer, SHIPPING, 'pay_1')
+
+        self.assertEqual([p.product_name for p in raised.exception.products], ['Item 1'])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+        self.assertEqual(sorted(Product.objects.values_list('stock', flat=True)), [2, 10])
+
+
+    def test_payment_id_of_another_customer_is_refused(self):
+        other = Customer.objects.create(
+            name='Binu', username='binu', password='x', address='x', email='binu@example.com',
+            phone='2', age=30, photo='c.png',
+        )
+        CartItem.objects.create(customer=other, product=Product.objects.create(
+            seller=self.seller, product_name='Soap', description='d', price=40, stock=5, photo='p.png',
+        ), quantity=1)
+        place_order(other, SHIPPING, 'pay_1')
+        self.fill_cart(1)
+
+        with self.assertRaises(CheckoutConflictError):
+            place_order(self.customer, SHIPPING, 'pay_1')
+
+        self.login_as('customer', self.customer.id)
+        response = self.client.post(reverse('success'), {'razorpay_payment_id': 'pay_1', 'idempotency_key': 'k2'})
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(CartItem.objects.filter(customer=self.customer).count(), 1)
+        self.assertEqual(Product.objects.get(product_name='Item 0').stock, 10)
+
+
+@test_settings
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Checkouts racing on separate connections, as they do in separate web workers."""
+
+    BUYERS = 8
+    STOCK = 5
+
+    def test_parallel_checkouts_queue_and_never_oversell(self):
+        seller = Seller.objects.create(
+            name='Unit 1', username='unit1', password='x', address='x', email='unit1@example.com',
+            phone='1', kudumbasree_details='NHG', passbook='p.png', is_approved=True,
+        )
+        product = Product.objects.create(
+            seller=seller, product_name='Jackfruit chips', description='d', price=100, cost_price=60,
+            stock=self.STOCK, photo='p.png',
+        )
+        customers = []
+        for i in range(self.BUYERS):
+            customer = Customer.objects.create(
+                name=f'Buyer {i}', username=f'buyer{i}', password='x', address='x',
+                email=f'buyer{i}@example.com', phone='1', age=30, photo='c.png',
+            )
+            CartItem.objects.create(customer=customer, product=product, quantity=1)
+            customers.append(customer)
+
+        start = threading.Barrier(self.BUYERS)
+        outcomes = []
+
+        def checkout(customer):
+            try:
+                start.wait()
+                place_order(customer, SHIPPING, f'pay_{customer.id}')
+                outcomes.append('placed')
+            except OutOfStockError:
+                outcomes.append('out of stock')
+            except Exception as error:
+                outcomes.append(repr(error))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=[customer]) for customer in customers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['out of stock'] * (self.BUYERS - self.STOCK) + ['placed'] * self.STOCK)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(OrderItem.objects.aggregate(units=Sum('quantity'))['units'], self.STOCK)
+
+
+class ReservationTests(StoreTestCase):
+    def stock(self):
+        return sorted(Product.objects.values_list('stock', flat=True))
+
+    def test_checkout_holds_and_order_consumes(self):
+        self.fill_cart(2, quantity=3)
+        reservations.reserve(self.customer, {item.product_id: item.quantity for item in CartItem.objects.all()})
+        self.assertEqual(self.stock(), [7, 7])
+
+        # Reloading the checkout page doesn't take the stock twice
+        reservations.reserve(self.customer, {item.product_id: item.quantity for item in CartItem.objects.all()})
+        self.assertEqual(self.stock(), [7, 7])
+
+        place_order(self.customer, SHIPPING, 'pay_1')
+        self.assertEqual(self.stock(), [7, 7])
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_holds_are_released(self):
+        self.fill_cart(2, quantity=3)
+        reservations.reserve(self.customer, {item.product_id: item.quantity for item in CartItem.objects.all()})
+
+        later = timezone.now() + reservations.RESERVATION_TTL + datetime.timedelta(seconds=1)
+        self.assertEqual(reservations.release_expired(batch_size=1, now=later), 2)
+        self.assertEqual(self.stock(), [10, 10])
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_reloading_checkout_does_not_extend_the_hold(self):
+        self.fill_cart(2, quantity=3)
+        quantities = {item.product_id: item.quantity for item in CartItem.objects.all()}
+        reservations.reserve(self.customer, quantities)
+        expiry = StockReservation.objects.values_list('expires_at', flat=True).first()
+
+        with mock.patch.object(timezone, 'now', return_value=timezone.now() + datetime.timedelta(minutes=10)):
+            reservations.reserve(self.customer, {product_id: 4 for product_id in quantities})
+        self.assertEqual(set(StockReservation.objects.values_list('expires_at', flat=True)), {expiry})
+        self.assertEqual(self.stock(), [6, 6])
+
+        self.assertEqual(reservations.release_expired(now=expiry), 2)
+        self.assertEqual(self.stock(), [10, 10])
+
+    def test_reloading_after_the_hold_lapsed_renews_it(self):
+        self.fill_cart(1, quantity=3)
+        quantities = {item.product_id: item.quantity for item in CartItem.objects.all()}
+        reservations.reserve(self.customer, quantities)
+
+        # Lapsed, but the sweeper hasn't run yet
+        reload_at = timezone.now() + reservations.RESERVATION_TTL + datetime.timedelta(minutes=1)
+        with mock.patch.object(timezone, 'now', return_value=reload_at):
+            reservations.reserve(self.customer, quantities)
+        self.assertEqual(StockReservation.objects.get().expires_at, reload_at + reservations.RESERVATION_TTL)
+
+        self.assertEqual(reservations.release_expired(now=reload_at + datetime.timedelta(minutes=1)), 0)
+        place_order(self.customer, SHIPPING, 'pay_1')
+        self.assertEqual(self.stock(), [7])
+
+    def test_seller_stock_edit_keeps_held_units(self):
+        self.fill_cart(1, quantity=3)
+        product = Product.objects.get()
+        reservations.reserve(self.customer, {product.id: 3})
+
+        # The seller's form was drawn before the hold and shows 10; they add 2
+        self.login_as('seller', self.seller.id)
+        self.client.post(reverse('update_product', args=[product.id]), {
+            'product_name': 'Item 0', 'price': '100', 'cost_price': '60', 'description': 'd', 'category': 'Food',
+            'stock': '12', 'stock_was': '10',
+        })
+        self.assertEqual(self.stock(), [9])
+
+        reservations.release_expired(now=timezone.now() + reservations.RESERVATION_TTL)
+        self.assertEqual(self.stock(), [12])
+
+
+class SalesRollupTests(StoreTestCase):
+    def test_checkout_updates_rollups_and_report(self):
+        self.fill_cart(2, quantity=3)
+        place_order(self.customer, SHIPPING, 'pay_1')
+        self.fill_cart(1, quantity=1)
+        place_order(self.customer, SHIPPING, 'pay_2')
+
+        today = timezone.localdate()
+        report = rollups.sales_report(today, today)
+        self.assertEqual(report['total_products_sold'], 7)
+        self.assertEqual(report['total_sales'], 700)
+        self.assertEqual(report['total_profit'], 280)
+        self.assertEqual(DailySellerSales.objects.get().units, 7)
+
+        # A full rebuild from the order items gives the same rows
+        before = list(DailyProductSales.objects.order_by('product_id').values_list('product_id', 'units', 'revenue'))
+        DailyProductSales.objects.all().delete()
+        rollups.refresh_day(today)
+        after = list(DailyProductSales.objects.order_by('product_id').values_list('product_id', 'units', 'revenue'))
+        self.assertEqual(before, after)
+
+    def test_checkout_adds_to_the_day_without_rereading_it(self):
+        self.fill_cart(1, quantity=2)
+        place_order(self.customer, SHIPPING, 'pay_1')
+        CartItem.objects.create(customer=self.customer, product=Product.objects.get(), quantity=1)
+        with CaptureQueriesContext(connection) as queries:
+            place_order(self.customer, SHIPPING, 'pay_2')
+        reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in reads if 'storeapp_orderitem' in sql])
+
+        row = DailyProductSales.objects.get()
+        self.assertEqual((row.units, row.revenue, row.cost), (3, 300, 180))
+        self.assertEqual(DailySellerSales.objects.get().revenue, 300)
+
+    def test_rebuild_leaves_out_cancelled_seller_orders(self):
+        self.fill_cart(1, quantity=2)
+        place_order(self.customer, SHIPPING, 'pay_1')
+        self.fill_cart(1, quantity=1)
+        cancelled, _ = place_order(self.customer, SHIPPING, 'pay_2')
+        SellerOrder.objects.filter(order=cancelled).update(status=OrderStatus.CANCELLED)
+
+        today = timezone.localdate()
+        rollups.refresh_day(today)
+        self.assertEqual(rollups.sales_totals(today, today)['total_sales'], 200)
+        self.assertEqual(DailySellerSales.objects.get().units, 2)
+
+
+
+class ReportRangeTests(StoreTestCase):
+    def range_for(self, **params):
+        return views.report_range(RequestFactory().get('/', params))[:2]
+
+    def test_explicit_range_needs_both_valid_ordered_dates(self):
+        march = (datetime.date(2025, 3, 1), datetime.date(2025, 3, 31))
+        self.assertEqual(self.range_for(year=2025, month=3), march)
+        self.assertEqual(
+            self.range_for(year=2025, month=3, start='2025-01-05', end='2025-02-10'),
+            (datetime.date(2025, 1, 5), datetime.date(2025, 2, 10)),
+        )
+        # Anything less falls back to the selected month as a whole
+        self.assertEqual(self.range_for(year=2025, month=3, start='2025-01-05'), march)
+        self.assertEqual(self.range_for(year=2025, month=3, start='2025-01-05', end='soon'), march)
+        self.assertEqual(self.range_for(year=2025, month=3, start='2025-04-05', end='2025-04-01'), march)
+        self.assertEqual(self.range_for(year=2025, month=13), self.range_for())
+
+
+class SalesExportTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('admin')
+
+    def export(self, name, **params):
+        response = self.client.get(reverse('export_sales', args=[name]), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_order_items_cover_live_and_archived_orders_in_date_order(self):
+        Customer.objects.filter(id=self.customer.id).update(name='=HYPERLINK("http://x")')
+        self.fill_cart(1)
+        old = place_order(self.customer, SHIPPING, 'pay_1')[0]
+        shares = SellerOrder.objects.filter(order=old)
+        for status in (OrderStatus.CONFIRMED, OrderStatus.SHIPPED, OrderStatus.DELIVERED):
+            fulfilment.transition(shares, status, 'test')
+        placed_at = timezone.now() - datetime.timedelta(days=400)
+        Order.objects.filter(id=old.id).update(created_at=placed_at)
+        shares.update(created_at=placed_at)
+        archive.archive_orders(archive.horizon(365))
+        self.fill_cart(2)
+        new = place_order(self.customer, SHIPPING, 'pay_2')[0]
+
+        content = self.export(
+            'order-items', start=timezone.localdate(placed_at).isoformat(), end=timezone.localdate().isoformat(),
+        )
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows[0], exports.EXPORTS['order-items'][0])
+        self.assertEqual([row[0] for row in rows[1:]], [str(old.id), str(new.id), str(new.id)])
+        self.assertEqual(rows[1][2], '\'=HYPERLINK("http://x")')
+
+    def test_formula_cells_are_escaped(self):
+        for value in ('=1+1', '+91 900', '-2', '@SUM(A1)'):
+            self.assertEqual(exports._cell(value), "'" + value)
+        self.assertEqual(exports._cell('Anu'), 'Anu')
+        self.assertEqual(exports._cell(Decimal('-5.00')), Decimal('-5.00'))
+
+        header = ''.join(exports.stream_csv(['Name'], [['=cmd']]))
+        self.assertEqual(header, "\ufeffName\r\n'=cmd\r\n")
+
+
+class SalesTrendTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        other = Seller.objects.create(
+            name='Unit 2', username='unit2', password='x', address='x', email='unit2@example.com',
+            phone='2', kudumbasree_details='NHG', passbook='p.png', is_approved=True,
+        )
+        pickle = Product.objects.create(
+            seller=self.seller, product_name='Pickle', description='d', price=50, stock=5, category='Pickles',
+            photo='p.png',
+        )
+        soap = Product.objects.create(
+            seller=other, product_name='Soap', description='d', price=50, stock=5, category='Soaps', photo='p.png',
+        )
+        # 2025-03-03 is 52 weeks after Monday 2024-03-04
+        for date, product, revenue in (
+            (datetime.date(2024, 3, 4), pickle, 100),
+            (datetime.date(2025, 3, 3), pickle, 150),
+            (datetime.date(2025, 3, 5), soap, 50),
+        ):
+            DailyProductSales.objects.create(
+                date=date, product=product, seller=product.seller, units=1, revenue=revenue, cost=revenue / 2,
+            )
+
+    def summary(self, rows):
+        return [(row['period'], row['group'], row['revenue'], row['yoy_change']) for row in rows]
+
+    def test_buckets_and_year_earlier_comparison(self):
+        start, end = datetime.date(2024, 1, 1), datetime.date(2025, 12, 31)
+        self.assertEqual(self.summary(trends.compute_trends(start, end, 'month')), [
+            (datetime.date(2024, 3, 1), None, 100, None),
+            (datetime.date(2025, 3, 1), None, 200, 100.0),
+        ])
+        self.assertEqual(self.summary(trends.compute_trends(start, end, 'week')), [
+            (datetime.date(2024, 3, 4), None, 100, None),
+            (datetime.date(2025, 3, 3), None, 200, 100.0),
+        ])
+        days = trends.compute_trends(start, end, 'day')
+        self.assertEqual(self.summary(days)[1:], [
+            (datetime.date(2025, 3, 3), None, 150, 50.0),
+            (datetime.date(2025, 3, 5), None, 50, None),
+        ])
+        self.assertEqual(days[1]['profit'], 75)
+
+    def test_grouping_by_seller_and_category(self):
+        start, end = datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)
+        self.assertEqual(self.summary(trends.compute_trends(start, end, 'month', 'seller')), [
+            (datetime.date(2025, 3, 1), 'Unit 1', 150, None),
+            (datetime.date(2025, 3, 1), 'Unit 2', 50, None),
+        ])
+        self.assertEqual(
+            [row['group'] for row in trends.compute_trends(start, end, 'month', 'category')], ['Pickles', 'Soaps'],
+        )
+
+    def test_cached_until_sales_change(self):
+        start, end = datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)
+        self.assertEqual(trends.sales_trends(start, end)[0]['revenue'], 200)
+        DailyProductSales.objects.update(revenue=0)
+        self.assertEqual(trends.sales_trends(start, end)[0]['revenue'], 200)
+        rollups.invalidate_sales()
+        self.assertEqual(trends.sales_trends(start, end)[0]['revenue'], 0)
+
+
+class SellerOrderTests(StoreTestCase):
+    def dashboard_queries(self):
+        self.login_as('seller', self.seller.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('seller_dashboard')).status_code, 200)
+        return len(queries)
+
+    def test_each_seller_gets_their_share(self):
+        other = Seller.objects.create(
+            name='Unit 2', username='unit2', password='x', address='x', email='unit2@example.com',
+            phone='1', kudumbasree_details='NHG', passbook='p.png', is_approved=True,
+        )
+        self.fill_cart(2, quantity=3)
+        product = Product.objects.create(
+            seller=other, product_name='Pickle', description='d', price=80, cost_price=50, stock=5, photo='p.png',
+        )
+        CartItem.objects.create(customer=self.customer, product=product, quantity=1)
+        order, _ = place_order(self.customer, SHIPPING, 'pay_1')
+
+        shares = {row.seller_id: row for row in SellerOrder.objects.filter(order=order)}
+        self.assertEqual((shares[self.seller.id].subtotal, shares[self.seller.id].item_count), (600, 6))
+        self.assertEqual((shares[other.id].subtotal, shares[other.id].item_count), (80, 1))
+
+    def test_dashboard_queries_do_not_grow_with_orders(self):
+        self.fill_cart(1)
+        place_order(self.customer, SHIPPING, 'pay_1')
+        self.dashboard_queries()  # warm the principal cache
+        baseline = self.dashboard_queries()
+        for n in range(2, 6):
+            self.fill_cart(1)
+            place_order(self.customer, SHIPPING, f'pay_{n}')
+        self.assertEqual(self.dashboard_queries(), baseline)
+
+
+class SellerStatsTests(StoreTestCase):
+    def test_checkout_keeps_stats_in_step_with_orders(self):
+        self.fill_cart(2, quantity=3, stock=8)
+        place_order(self.customer, SHIPPING, None)
+        self.fill_cart(1, quantity=1)
+        place_order(self.customer, SHIPPING, None)
+
+        stats = SellerStats.objects.get(seller=self.seller)
+        self.assertEqual((stats.revenue, stats.units, stats.orders), (700, 7, 2))
+        self.assertEqual((stats.recent_revenue, stats.recent_orders), (700, 2))
+        self.assertEqual(stats.low_stock_products, 2)
+        self.assertEqual(seller_stats.reconcile([self.seller.id], fix=False), [])
+
+        SellerStats.objects.update(units=1)
+        self.assertEqual(seller_stats.reconcile([self.seller.id]), [(self.seller.id, 'units', 1, 7)])
+        self.assertEqual(SellerStats.objects.get().units, 7)
+
+    def test_cancelled_seller_orders_are_taken_back_out(self):
+        self.fill_cart(2, quantity=3)
+        place_order(self.customer, SHIPPING, None)
+        self.fill_cart(1, quantity=1)
+        cancelled, _ = place_order(self.customer, SHIPPING, None)
+
+        shares = list(SellerOrder.objects.filter(order=cancelled))
+        SellerOrder.objects.filter(order=cancelled).update(status=OrderStatus.CANCELLED)
+        seller_stats.record_cancellation(shares)
+
+        stats = SellerStats.objects.get(seller=self.seller)
+        self.assertEqual((stats.revenue, stats.units, stats.orders), (600, 6, 1))
+        self.assertEqual((stats.recent_revenue, stats.recent_units, stats.recent_orders), (600, 6, 1))
+        self.assertEqual(seller_stats.reconcile([self.seller.id], fix=False), [])
+
+
+class ProductImportTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def photos_zip(self):
+        image = io.BytesIO()
+        Image.new('RGB', (4, 4)).save(image, 'PNG')
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('photos/pickle.png', image.getvalue())
+        return SimpleUploadedFile('photos.zip', archive.getvalue())
+
+    def test_rows_are_created_updated_or_reported(self):
+        Product.objects.create(
+            seller=self.seller, product_name='Banana Chips', description='d', price=50, stock=20, photo='p.png',
+        )
+        rows = [
+            'product_name,description,price,cost_price,stock,category,photo',
+            'Banana Chips,Crisp,60,35,4,Snacks,',
+            'Mango Pickle,Spicy,120,70,3,Pickles,pickle.png',
+            'Lime Pickle,Sour,abc,,5,Pickles,pickle.png',
+            'Jackfruit Jam,Sweet,90,,5,Jams,',
+        ] + [f'Item {i},d,10,5,8,Crafts,pickle.png' for i in range(5)]
+        csv_file = SimpleUploadedFile('products.csv', '\n'.join(rows).encode())
+
+        result = product_import.import_products(self.seller, csv_file, self.photos_zip(), chunk_size=2)
+
+        self.assertEqual((result.created, result.updated, result.error_count), (6, 1, 2))
+        self.assertEqual([line for line, _ in result.errors], [4, 5])
+        # An existing product takes the row's price but keeps its stock; a new one starts with the row's
+        self.assertEqual(
+            Product.objects.filter(product_name='Banana Chips').values_list('price', 'stock').get(), (60, 20),
+        )
+        self.assertEqual(Product.objects.get(product_name='Mango Pickle').stock, 3)
+        self.assertTrue(Product.objects.get(product_name='Mango Pickle').is_visible)
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).low_stock_products, 1)
+
+    def test_corrupt_photo_is_reported_against_its_row(self):
+        image = io.BytesIO()
+        Image.new('RGB', (4, 4)).save(image, 'PNG')
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+            zf.writestr('pickle.png', image.getvalue())
+            zf.writestr('jam.png', image.getvalue())
+        data = bytearray(archive.getvalue())
+        data[data.find(image.getvalue()) + 30] ^= 0xFF  # first member's CRC no longer matches
+        rows = [
+            'product_name,description,price,stock,photo',
+            'Mango Pickle,d,120,15,pickle.png',
+            'Jackfruit Jam,d,90,5,jam.png',
+        ]
+
+        result = product_import.import_products(
+            self.seller, SimpleUploadedFile('products.csv', '\n'.join(rows).encode()),
+            SimpleUploadedFile('photos.zip', bytes(data)),
+        )
+
+        self.assertEqual((result.created, result.error_count), (1, 1))
+        self.assertEqual(result.errors[0][0], 2)
+        self.assertIn('could not be read from the zip', result.errors[0][1])
+
+    def test_grid_moves_stock_by_the_edited_difference(self):
+        self.fill_cart(2, stock=10)
+        first, second = Product.objects.order_by('id')
+        Product.objects.filter(id=first.id).update(stock=7)  # sold while the grid was open
+        data = {}
+        for product in (first, second):
+            data.update({
+                f'price_{product.id}': '100', f'cost_price_{product.id}': '60',
+                f'stock_{product.id}': '10', f'stock_was_{product.id}': '10',
+            })
+        data[f'stock_{first.id}'], data[f'price_{second.id}'] = '12', '150'
+
+        changes, errors = product_import.grid_changes(data, Product.objects.filter(seller=self.seller))
+        with self.assertNumQueries(2):
+            product_import.update_prices_and_stock(self.seller, changes)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('price', 'stock')), [(100, 9), (150, 10)],
+        )
+
+
+class ImageVariantTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_variants_are_resized_and_used_in_srcset(self):
+        photo = io.BytesIO()
+        Image.new('RGBA', (2000, 1000)).save(photo, 'PNG')
+        product = Product.objects.create(
+            seller=self.seller, product_name='Mat', description='d', price=100, stock=5,
+            photo=SimpleUploadedFile('mat.png', photo.getvalue()),
+        )
+        tag = Template('{% load media_tags %}{% responsive_image product.photo sizes="64px" %}')
+        self.assertNotIn('srcset', tag.render(Context({'product': product})))
+
+        images.make_variants(product.photo.name)
+
+        with product.photo.storage.open(images.variant_name(product.photo.name, 320, 'webp')) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 160))
+        html = tag.render(Context({'product': product}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f"{images.variant_name(product.photo.name, 640, 'jpg')} 640w", html)
+
+    def test_readiness_is_cached_rather_than_checked_on_the_storage(self):
+        product = Product.objects.create(
+            seller=self.seller, product_name='Mat', description='d', price=100, stock=5,
+            photo=SimpleUploadedFile('mat.png', self.png()),
+        )
+        images.make_variants(product.photo.name)
+        tag = Template('{% load media_tags %}{% responsive_image product.photo %}')
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists:
+            self.assertIn('srcset', tag.render(Context({'product': product})))
+        exists.assert_not_called()
+
+    def test_passbooks_get_no_variants(self):
+        seller = Seller.objects.create(
+            name='Unit 2', username='unit2', password='x', address='x', email='unit2@example.com',
+            phone='1', kudumbasree_details='NHG', passbook=SimpleUploadedFile('pass.png', self.png()),
+        )
+        product = Product.objects.create(
+            seller=seller, product_name='Mat', description='d', price=100, stock=5,
+            photo=SimpleUploadedFile('mat.png', self.png()),
+        )
+        queued = set(PendingVariant.objects.values_list('name', flat=True))
+        self.assertIn(product.photo.name, queued)
+        self.assertNotIn(seller.passbook.name, queued)
+
+    def test_queued_uploads_are_rendered_by_the_command_pool(self):
+        product = Product.objects.create(
+            seller=self.seller, product_name='Mat', description='d', price=100, stock=5,
+            photo=SimpleUploadedFile('mat.png', self.png(size=(1000, 500))),
+        )
+        self.assertFalse(images.has_variants(product.photo.name))
+
+        call_command('make_image_variants', workers=1, stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertTrue(images.has_variants(product.photo.name))
+        with product.photo.storage.open(images.variant_name(product.photo.name, 640, 'jpg')) as variant:
+            self.assertEqual(Image.open(variant).size, (640, 320))
+        self.assertFalse(PendingVariant.objects.exists())
+
+    def test_worker_module_does_not_load_django(self):
+        script = 'import sys, storeapp.image_worker; print(sorted({m.split(".")[0] for m in sys.modules}))'
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        )
+        self.assertNotIn("'django'", result.stdout)
+
+    def png(self, size=(400, 200)):
+        photo = io.BytesIO()
+        Image.new('RGB', size, 'green').save(photo, 'PNG')
+        return photo.getvalue()
+
+
+class ContentAddressedMediaTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self, name, colour):
+        photo = io.BytesIO()
+        Image.new('RGB', (40, 40), colour).save(photo, 'PNG')
+        return Product.objects.create(
+            seller=self.seller, product_name=name, description='d', price=100, stock=5,
+            photo=SimpleUploadedFile(f'{name}.png', photo.getvalue()),
+        )
+
+    def refs(self, product):
+        return StoredFile.objects.get(name=product.photo.name).ref_count
+
+    def test_identical_uploads_share_one_counted_file(self):
+        first, second, other = self.upload('Mat', 'red'), self.upload('Mat copy', 'red'), self.upload('Bag', 'blue')
+
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertNotEqual(first.photo.name, other.photo.name)
+        self.assertEqual(self.refs(first), 2)
+
+        first.delete()
+        other.photo = second.photo.name
+        other.save()
+        self.assertEqual(self.refs(second), 2)
+        released = StoredFile.objects.exclude(name=second.photo.name).filter(name__contains='/').get()
+        self.assertEqual(released.ref_count, 0)
+
+
+    def test_unreferenced_files_and_their_variants_are_swept(self):
+        kept, dropped = self.upload('Mat', 'red'), self.upload('Bag', 'blue')
+        images.make_variants(dropped.photo.name)
+        dropped_files = [dropped.photo.name, *images.variant_names(dropped.photo.name)]
+        dropped.delete()
+
+        self.assertEqual(list(media_gc.find_orphans(min_age_hours=1)), [])
+        orphans = list(media_gc.find_orphans(min_age_hours=0))
+        self.assertEqual(sorted(name for name, _, _ in orphans), sorted(dropped_files))
+
+        media_gc.remove(orphans)
+        storage = kept.photo.storage
+        self.assertTrue(storage.exists(kept.photo.name))
+        self.assertFalse(any(storage.exists(name) for name in dropped_files))
+        self.assertFalse(StoredFile.objects.filter(name=dropped_files[0]).exists())
+
+    def test_variants_of_passbooks_are_swept(self):
+        passbook = io.BytesIO()
+        Image.new('RGB', (40, 40), 'white').save(passbook, 'PNG')
+        seller = Seller.objects.create(
+            name='Unit 2', username='unit2', password='x', address='x', email='unit2@example.com',
+            phone='1', kudumbasree_details='NHG', passbook=SimpleUploadedFile('pass.png', passbook.getvalue()),
+        )
+        images.make_variants(seller.passbook.name)
+
+        orphans = list(media_gc.find_orphans(min_age_hours=0))
+        self.assertEqual(sorted(name for name, _, _ in orphans), sorted(images.variant_names(seller.passbook.name)))
+        media_gc.remove(orphans)
+        self.assertFalse(images.has_variants(seller.passbook.name))
+
+
+class AssetBundleTests(StoreTestCase):
+    def test_pages_use_the_built_bundle(self):
+        response = self.client.get(reverse('products'))
+        self.assertContains(response, '/static/css/app.css')
+        self.assertNotContains(response, 'cdn.tailwindcss.com')
+        self.assertNotContains(response, 'fonts.googleapis.com')
+
+    def test_every_icon_in_the_templates_is_in_the_subset(self):
+        icon_css = assets.ICON_CSS.read_text(encoding='utf-8')
+        for icon in assets.used_icons():
+            self.assertIn(f'.{icon}::before', icon_css)
+
+
+class StaticFilesTests(StoreTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, static_root)
+        cls.enterClassContext(override_settings(
+            STATIC_ROOT=static_root,
+            # The project's own files; the admin's would only slow the test down
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'storeapp.storage.PrecompressedManifestStaticFilesStorage'},
+            },
+        ))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.app = static_serving.StaticFilesApplication(lambda environ, start_response: [b'django'])
+
+    def get(self, path, **headers):
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'], response['headers'] = status, dict(response_headers)
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **headers}
+        response['body'] = b''.join(self.app(environ, start_response))
+        return response
+
+    def test_collectstatic_hashes_the_bundle_and_the_font_it_loads(self):
+        font_url = staticfiles_storage.url('fonts/fa-solid.woff2')
+        with staticfiles_storage.open(staticfiles_storage.stored_name('css/icons.css')) as icon_css:
+            icon_css = icon_css.read().decode()
+        self.assertRegex(font_url, r'fa-solid\.[0-9a-f]{12}\.woff2$')
+        self.assertIn(font_url.rsplit('/', 1)[1], icon_css)
+
+    def test_text_files_are_precompressed_and_served_by_accept_encoding(self):
+        bundle = staticfiles_storage.stored_name('css/app.css')
+        self.assertTrue(staticfiles_storage.exists(bundle + '.gz'))
+        self.assertFalse(staticfiles_storage.exists(staticfiles_storage.stored_name('img/banner1.png') + '.gz'))
+        url = staticfiles_storage.url('css/app.css')
+
+        gzipped = self.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(gzipped['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(gzipped['headers']['Cache-Control'], static_serving.IMMUTABLE)
+        self.assertEqual(gzipped['headers']['Vary'], 'Accept-Encoding')
+        plain = self.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', plain['headers'])
+        self.assertEqual(gzip.decompress(gzipped['body']), plain['body'])
+        if storage.brotli is not None:
+            self.assertEqual(self.get(url, HTTP_ACCEPT_ENCODING='gzip, br')['headers']['Content-Encoding'], 'br')
+
+        again = self.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['headers']['ETag'])
+        self.assertEqual(again['status'], '304 Not Modified')
+        self.assertEqual(self.get('/static/manifest.json')['headers']['Cache-Control'], static_serving.REVALIDATE)
+        self.assertEqual(self.get('/static/../store/settings.py')['body'], b'django')
+        self.assertEqual(self.get('/products/')['body'], b'django')
+
+
+class CommunityFeedTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        posts = CommunityPost.objects.bulk_create(
+            [CommunityPost(description=f'Post {i}') for i in range(feed.FEED_PAGE_SIZE + 2)]
+        )
+        # bulk_create stamps one created_at; spread them out, oldest first
+        start = timezone.now() - datetime.timedelta(days=len(posts))
+        for i, post in enumerate(posts):
+            CommunityPost.objects.filter(id=post.id).update(created_at=start + datetime.timedelta(days=i))
+
+    def test_feed_is_paged_newest_first(self):
+        page = self.client.get(reverse('community')).context['page']
+        self.assertEqual(page.object_list[0].description, 'Post 11')
+        self.assertEqual(len(page), feed.FEED_PAGE_SIZE)
+
+        with self.assertNumQueries(1):
+            rest = self.client.get(reverse('community_feed'), {'cursor': page.next_cursor})
+        self.assertEqual([post.description for post in rest.context['page']], ['Post 1', 'Post 0'])
+        self.assertNotContains(rest, 'feed-more')
+
+    def test_cached_post_is_refreshed_when_edited(self):
+        post = CommunityPost.objects.get(description='Post 11')
+        self.assertContains(self.client.get(reverse('community')), 'Post 11')
+
+        self.login_as('admin')
+        self.client.post(reverse('update_post', args=[post.id]), {'description': 'Fair on Sunday'})
+        response = self.client.get(reverse('community'))
+        self.assertContains(response, 'Fair on Sunday')
+        self.assertNotContains(response, 'Post 11')
+
+    def test_edit_changes_the_fragment_key_rather_than_deleting_it(self):
+        post = CommunityPost.objects.get(description='Post 11')
+        self.client.get(reverse('community'))
+        cached = make_template_fragment_key('community_post', [post.id, post.updated_at, False])
+        self.assertIsNotNone(cache.get(cached))
+
+        post.description = 'Fair on Sunday'
+        post.save()
+        self.assertIsNotNone(cache.get(cached))
+        self.assertContains(self.client.get(reverse('community')), 'Fair on Sunday')
+
+    def test_image_readiness_is_read_from_the_cache(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        photo = io.BytesIO()
+        Image.new('RGB', (800, 400), 'green').save(photo, 'PNG')
+        post = CommunityPost.objects.create(description='Fair', image=SimpleUploadedFile('fair.png', photo.getvalue()))
+        images.make_variants(post.image.name)
+
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists:
+            response = self.client.get(reverse('community'))
+        exists.assert_not_called()
+        self.assertContains(response, 'type="image/webp"')
+
+
+class OrderHistoryTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('customer', self.customer.id)
+
+    def place(self, lines):
+        self.fill_cart(lines)
+        return place_order(self.customer, SHIPPING, None)[0]
+
+    def test_order_detail_query_count_does_not_grow_with_items(self):
+        small, large = self.place(1), self.place(8)
+        self.client.get(reverse('order_detail', args=[small.id]))  # warm the principal and cart caches
+
+        for order in (small, large):
+            # Session, order with payment, items with products and sellers
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('order_detail', args=[order.id]))
+            self.assertEqual(len(response.context['order_items']), order.items.count())
+
+    def test_history_is_paged_with_a_fixed_number_of_queries(self):
+        orders = [self.place(lines) for lines in range(1, 4) for _ in range(8)]
+        self.client.get(reverse('my_orders'))
+
+        # Session, page of orders, their items with products
+        with self.assertNumQueries(3):
+            first = self.client.get(reverse('my_orders')).context['page']
+        self.assertEqual([order.id for order in first], [order.id for order in orders[::-1][:20]])
+        self.assertContains(self.client.get(reverse('my_orders')), 'Item 2 × 2')
+
+        rest = self.client.get(reverse('my_orders'), {'cursor': first.next_cursor}).context['page']
+        self.assertEqual([order.id for order in rest], [order.id for order in orders[:4][::-1]])
+        self.assertFalse(rest.has_next)
+
+
+class OrderArchiveTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('customer', self.customer.id)
+
+    def place(self, status, days_ago):
+        self.fill_cart(2)
+        order = place_order(self.customer, SHIPPING, None)[0]
+        shares = SellerOrder.objects.filter(order=order)
+        forward = [OrderStatus.CONFIRMED, OrderStatus.SHIPPED, OrderStatus.DELIVERED]
+        steps = [status] if status == OrderStatus.CANCELLED else forward[:forward.index(status) + 1]
+        for step in steps:
+            fulfilment.transition(shares, step, 'test')
+        placed_at = timezone.now() - datetime.timedelta(days=days_ago)
+        Order.objects.filter(id=order.id).update(created_at=placed_at)
+        shares.update(created_at=placed_at)
+        return Order.objects.get(id=order.id)
+
+    def test_closed_old_orders_move_and_reports_are_unchanged(self):
+        delivered = self.place(OrderStatus.DELIVERED, 400)
+        cancelled = self.place(OrderStatus.CANCELLED, 400)
+        shipped = self.place(OrderStatus.SHIPPED, 400)
+        recent = self.place(OrderStatus.DELIVERED, 10)
+        day = timezone.localdate(delivered.created_at)
+        rollups.refresh_day(day)
+        seller_stats.reconcile([self.seller.id])
+        before = list(DailyProductSales.objects.filter(date=day).values_list('product_id', 'units', 'revenue', 'cost'))
+
+        self.assertEqual(archive.archive_orders(archive.horizon(365), batch_size=1), 2)
+
+        self.assertEqual(set(ArchivedOrder.objects.values_list('id', flat=True)), {delivered.id, cancelled.id})
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {shipped.id, recent.id})
+        self.assertEqual(ArchivedOrderItem.objects.count(), 4)
+        self.assertEqual(ArchivedOrderStatusChange.objects.filter(seller_order__order=delivered.id).count(), 3)
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[delivered.id, cancelled.id]).exists())
+
+        rollups.refresh_day(day)
+        self.assertEqual(
+            list(DailyProductSales.objects.filter(date=day).values_list('product_id', 'units', 'revenue', 'cost')),
+            before,
+        )
+        self.assertEqual(rollups.order_days(), sorted({day, timezone.localdate(recent.created_at)}))
+        self.assertEqual(seller_stats.reconcile([self.seller.id], fix=False), [])
+
+    def test_customer_still_sees_archived_orders(self):
+        old = self.place(OrderStatus.DELIVERED, 400)
+        live = self.place(OrderStatus.DELIVERED, 10)
+        archive.archive_orders(archive.horizon(365))
+
+        response = self.client.get(reverse('order_detail', args=[old.id]))
+        self.assertEqual(response.context['order'].id, old.id)
+        self.assertEqual(len(response.context['order_items']), 2)
+        self.assertIsNotNone(response.context['payment'])
+
+        history = self.client.get(reverse('my_orders'))
+        self.assertEqual([order.id for order in history.context['page']], [live.id])
+        self.assertEqual(history.context['older_url'], '?archive=1')
+        archived = self.client.get(reverse('my_orders'), {'archive': 1})
+        self.assertEqual([order.id for order in archived.context['page']], [old.id])
+        self.assertEqual(archived.context['newer_url'], reverse('my_orders'))
+
+    def test_recent_orders_cannot_be_archived(self):
+        with self.assertRaises(ValueError):
+            archive.archive_orders(archive.horizon(seller_stats.RECENT_DAYS - 5))
+
+
+class FulfilmentTests(StoreTestCase):
+    def place_orders(self, count):
+        for _ in range(count):
+            self.fill_cart(1)
+            place_order(self.customer, SHIPPING, None)
+        return SellerOrder.objects.filter(seller=self.seller)
+
+    def test_bulk_transition_takes_fixed_statements(self):
+        self.place_orders(3)
+        with CaptureQueriesContext(connection) as small:
+            fulfilment.transition(SellerOrder.objects.filter(seller=self.seller), OrderStatus.CONFIRMED, 'test')
+        self.place_orders(20)
+        with CaptureQueriesContext(connection) as large:
+            moved = fulfilment.transition(SellerOrder.objects.filter(seller=self.seller), OrderStatus.CONFIRMED, 'test')
+
+        self.assertEqual(moved, 20)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(OrderStatusChange.objects.count(), 23)
+        self.assertFalse(Order.objects.exclude(status=OrderStatus.CONFIRMED).exists())
+
+    def test_only_allowed_moves_are_applied(self):
+        shares = self.place_orders(2)
+        fulfilment.transition(shares.filter(order_id=shares[0].order_id), OrderStatus.CANCELLED, 'test')
+
+        # Shipping needs a confirmed order; the placed one and the cancelled one both stay put
+        self.assertEqual(fulfilment.transition(shares.all(), OrderStatus.SHIPPED, 'test'), 0)
+        self.assertEqual(
+            sorted(Order.objects.values_list('status', flat=True)), [OrderStatus.CANCELLED, OrderStatus.PLACED],
+        )
+
+    def test_cancelling_restocks_and_corrects_sales_figures(self):
+        other = Seller.objects.create(
+            name='Unit 2', username='unit2', password='x', address='x', email='unit2@example.com',
+            phone='2', kudumbasree_details='NHG', passbook='p.png', is_approved=True,
+        )
+        soap = Product.objects.create(
+            seller=other, product_name='Soap', description='d', price=40, cost_price=10, stock=10, photo='p.png',
+        )
+        self.fill_cart(2, quantity=3)
+        CartItem.objects.create(customer=self.customer, product=soap, quantity=2)
+        order, _ = place_order(self.customer, SHIPPING, None)
+
+        mine = SellerOrder.objects.filter(order=order, seller=self.seller)
+        fulfilment.transition(mine, OrderStatus.CANCELLED, 'test')
+
+        self.assertEqual(sorted(Product.objects.values_list('stock', flat=True)), [8, 10, 10])
+        today = timezone.localdate()
+        self.assertEqual(rollups.sales_totals(today, today), {
+            'total_sales': 80, 'total_profit': 60, 'total_products_sold': 2,
+        })
+        self.assertEqual(list(DailySellerSales.objects.values_list('seller_id', 'units')), [(other.id, 2)])
+        columns = ('product_id', 'units', 'revenue', 'cost')
+        incremental = list(DailyProductSales.objects.values_list(*columns))
+        rollups.refresh_day(today)
+        self.assertEqual(list(DailyProductSales.objects.values_list(*columns)), incremental)
+        self.assertEqual(seller_stats.reconcile([self.seller.id, other.id], fix=False), [])
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).orders, 0)
+        self.assertEqual(Order.objects.get().status, OrderStatus.PLACED)
+
+
+class AdminTabTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('admin')
+
+    def test_customer_tab_is_searched_and_paged(self):
+        for i in range(30):
+            Customer.objects.create(
+                name=f'Member {i:02}', username=f'member{i}', password='x', address='x',
+                email=f'member{i}@example.com', phone='1', age=30, photo='c.png',
+            )
+        url = reverse('admin_customers')
+
+        first = self.client.get(url, {'q': 'member', 'sort': 'name', 'format': 'json'}).json()
+        second = self.client.get(url, {'q': 'member', 'sort': 'name', 'format': 'json', 'cursor': first['next']}).json()
+
+        names = [row['name'] for row in first['results'] + second['results']]
+        self.assertEqual(names, [f'Member {i:02}' for i in range(30)])
+        self.assertIsNone(second['next'])
+
+    def test_tabs_are_admin_only(self):
+        self.client.session.flush()
+        self.assertEqual(self.client.get(reverse('admin_posts')).status_code, 403)
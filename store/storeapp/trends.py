@@ -0,0 +1,80 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .caching import versioned_key
+from .models import DailyProductSales
+from .rollups import SALES_NAMESPACE
+
+# --- Sales trends ---
+#
+# Revenue, profit and units per day, week or month, optionally split by
+# seller or category. A whole window comes from one GROUP BY over the daily
+# rollups, truncated to the period, and is cached under the "sales" version
+# so it is recomputed only after new orders land.
+
+TREND_CACHE_TIMEOUT = 60 * 60 * 24
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# group -> (value fields, label field)
+GROUPS = {
+    'total': ((), None),
+    'seller': (('seller_id', 'seller__name'), 'seller__name'),
+    'category': (('product__category',), 'product__category'),
+}
+
+
+def _year_earlier(period_start, period):
+    """Start of the matching period one year before `period_start`."""
+    if period == 'month':
+        return period_start.replace(year=period_start.year - 1)
+    # 52 weeks back keeps days and weeks on the same weekday
+    return period_start - datetime.timedelta(weeks=52)
+
+
+def compute_trends(start, end, period='month', group='total'):
+    """Rows of period, group label, units, revenue, cost and profit for the dates [start, end]."""
+    fields, label = GROUPS[group]
+    rows = (
+        DailyProductSales.objects
+        .filter(date__range=(start, end))
+        .annotate(period=PERIODS[period]('date'))
+        .values('period', *fields)
+        .annotate(units=Sum('units'), revenue=Sum('revenue'), cost=Sum('cost'))
+        .order_by('period', *fields)
+    )
+    results = [
+        {
+            'period': row['period'],
+            'group': row[label] if label else None,
+            'units': row['units'],
+            'revenue': row['revenue'],
+            'cost': row['cost'],
+            'profit': row['revenue'] - row['cost'],
+        }
+        for row in rows
+    ]
+
+    # Year-over-year change, where the window reaches back far enough
+    revenue_by_key = {(row['period'], row['group']): row['revenue'] for row in results}
+    for row in results:
+        previous = revenue_by_key.get((_year_earlier(row['period'], period), row['group']))
+        row['yoy_change'] = round(100 * (row['revenue'] - previous) / previous, 1) if previous else None
+    return results
+
+
+def sales_trends(start, end, period='month', group='total'):
+    """compute_trends(), cached until the next order is placed."""
+    key = versioned_key(SALES_NAMESPACE, 'trends', period, group, start.isoformat(), end.isoformat())
+    results = cache.get(key)
+    if results is None:
+        results = compute_trends(start, end, period, group)
+        cache.set(key, results, TREND_CACHE_TIMEOUT)
+    return results
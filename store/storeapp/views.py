@@ -1,52 +1,68 @@
-import os
+import functools
+import uuid
+from urllib.parse import urlencode
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Customer, Seller, CartItem, Product, Feedback, Order, OrderItem, Payment, CommunityPost
+from django.urls import reverse
+from .models import (
+    ArchivedOrder, Customer, Seller, SellerOrder, OrderStatus, CartItem, Product, Feedback, Order, CommunityPost,
+)
+from . import (
+    archive, exports, facets, feed, fulfilment, product_import, reservations, rollups, search, seller_stats, trends,
+)
+from .cart import get_cart_summary, invalidate_cart
+from .orders import CheckoutConflictError, OutOfStockError, place_order
+from .pagination import KeysetPaginator, cached_count
+from .principals import PRINCIPAL_MODELS, get_principal, remember_principal
+from .stock import adjust_stock
 from django.contrib import messages
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.fields.files import FieldFile
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from decimal import Decimal
-from django.core.paginator import Paginator
-from django.db.models import Q, Sum, F, ExpressionWrapper, DecimalField
+from django.db.models import Q
 from django.db import transaction
 from django.utils import timezone
+import calendar
 import datetime
 
 
 # --- Helper Functions ---
 def get_logged_in_user(request):
-    user_type = request.session.get('user_type')
-    user_id = request.session.get('user_id')
+    """Return (user_type, Customer/Seller) for the session, loading it once per request."""
+    if not hasattr(request, '_logged_in_user'):
+        request._logged_in_user = _load_logged_in_user(request)
+    return request._logged_in_user
+
 
+def _load_logged_in_user(request):
+    user_type = request.session.get('user_type')
     if user_type == 'admin':
         return 'admin', None
-
-    if not user_id:
+    model = PRINCIPAL_MODELS.get(user_type)
+    user_id = request.session.get('user_id')
+    if model is None or not user_id:
+        return None, None
+    user = model.objects.filter(id=user_id).first()
+    if user is None:
         return None, None
+    # The row also answers get_customer_id() for the rest of this request
+    request.principal = remember_principal(user_type, user)
+    return user_type, user
 
-    if user_type == 'customer':
-        try:
-            return 'customer', Customer.objects.get(id=user_id)
-        except Customer.DoesNotExist:
-            return None, None
-    elif user_type == 'seller':
-        try:
-            return 'seller', Seller.objects.get(id=user_id)
-        except Seller.DoesNotExist:
-            return None, None
-    return None, None
 
+def get_customer_id(request):
+    """Id of the logged-in customer from the cached principal, or None."""
+    principal = getattr(request, 'principal', None) or get_principal(request)
+    return principal.id if principal.type == 'customer' else None
 
-def get_cart_context(customer):
-    """Helper to get cart items and count for a logged-in customer."""
-    if not customer:
-        return {'cart_items': [], 'cart_item_count': 0, 'cart_product_ids': []}
-    
-    cart_items = CartItem.objects.filter(customer=customer)
-    cart_item_count = sum(item.quantity for item in cart_items)
-    cart_product_ids = list(cart_items.values_list('product_id', flat=True))
-    
+
+def get_cart_context(customer_id):
+    """Helper to get the cached cart count and product ids for the header."""
+    summary = get_cart_summary(customer_id)
     return {
-        'cart_items': cart_items,
-        'cart_item_count': cart_item_count,
-        'cart_product_ids': cart_product_ids,
+        'cart_item_count': summary['item_count'],
+        'cart_product_ids': summary['product_ids'],
+        'cart_subtotal': summary['subtotal'],
     }
 
 
@@ -163,48 +179,41 @@ def logout_view(request):
 
 
 # --- Admin Views ---
+def report_range(request):
+    """(start, end, year, month) for the sales report filters in the query string."""
+    current_time = timezone.now()
+    try:
+        selected_year = int(request.GET.get('year', current_time.year))
+        selected_month = int(request.GET.get('month', current_time.month))
+        start_date = datetime.date(selected_year, selected_month, 1)
+    except ValueError:
+        selected_year, selected_month = current_time.year, current_time.month
+        start_date = datetime.date(selected_year, selected_month, 1)
+    end_date = datetime.date(selected_year, selected_month, calendar.monthrange(selected_year, selected_month)[1])
+
+    # An explicit date range wins over the month/year selection, but only a complete, valid one
+    try:
+        range_start = datetime.date.fromisoformat(request.GET.get('start', ''))
+        range_end = datetime.date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        pass
+    else:
+        if range_start <= range_end:
+            start_date, end_date = range_start, range_end
+    return start_date, end_date, selected_year, selected_month
+
+
 def admin_dashboard(request):
+    """The admin panel shell. Each tab is fetched from its own endpoint when opened."""
     user_type, _ = get_logged_in_user(request)
     if user_type != 'admin':
         messages.warning(request, "Admin access only.")
         return redirect('login')
 
-    # --- Sales Report Logic ---
-    current_time = timezone.now()
-    selected_year = int(request.GET.get('year', current_time.year))
-    selected_month = int(request.GET.get('month', current_time.month))
-
-    # Base queryset for all calculations
-    items_sold = OrderItem.objects.filter(
-        order__created_at__year=selected_year,
-        order__created_at__month=selected_month
-    )
-
-    # 1. Total Stats
-    total_sales = items_sold.aggregate(total=Sum(F('price') * F('quantity')))['total'] or 0
-    total_cost = items_sold.aggregate(total=Sum(F('cost_price') * F('quantity')))['total'] or 0
-    total_profit = total_sales - total_cost
-    total_products_sold = items_sold.aggregate(total=Sum('quantity'))['total'] or 0
-
-    # 2. Product-wise Stats
-    product_sales = items_sold.values('product__product_name', 'product__seller__name').annotate(
-        total_quantity_sold=Sum('quantity'),
-        total_revenue=Sum(F('quantity') * F('price')),
-        total_cost=Sum(F('quantity') * F('cost_price'))
-    ).annotate(
-        total_profit=ExpressionWrapper(F('total_revenue') - F('total_cost'), output_field=DecimalField())
-    ).order_by('-total_profit')
-
-    # 3. Seller-wise Stats
-    seller_sales = items_sold.values('product__seller__name').annotate(
-        total_quantity_sold=Sum('quantity'),
-        total_revenue=Sum(F('quantity') * F('price')),
-        total_cost=Sum(F('quantity') * F('cost_price'))
-    ).annotate(
-        total_profit=ExpressionWrapper(F('total_revenue') - F('total_cost'), output_field=DecimalField())
-    ).order_by('-total_profit')
+    start_date, end_date, selected_year, selected_month = report_range(request)
 
     # Data for filters
+    current_time = timezone.now()
     years = range(2024, current_time.year + 1)
     months = [
         {"value": 1, "name": "January"}, {"value": 2, "name": "February"},
@@ -215,22 +224,9 @@ def admin_dashboard(request):
         {"value": 11, "name": "November"}, {"value": 12, "name": "December"}
     ]
 
-    # --- Other Dashboard Data ---
-    customers = Customer.objects.all()
-    approved_sellers = Seller.objects.filter(is_approved=True)
-    pending_sellers = Seller.objects.filter(is_approved=False)
-    posts = CommunityPost.objects.all().order_by('-created_at')
-    
     context = {
-        'customers': customers,
-        'approved_sellers': approved_sellers,
-        'pending_sellers': pending_sellers,
-        'posts': posts,
-        'total_sales': total_sales,
-        'total_profit': total_profit,
-        'total_products_sold': total_products_sold,
-        'product_sales': product_sales,
-        'seller_sales': seller_sales,
+        'start_date': start_date,
+        'end_date': end_date,
         'selected_year': selected_year,
         'selected_month': selected_month,
         'years': years,
@@ -307,7 +303,293 @@ def delete_post(request, post_id):
     return redirect('admin_dashboard')
 
 
+
+
+def export_sales(request, export_name):
+    """Stream order items, product-wise or seller-wise sales for the report range as CSV."""
+    user_type, _ = get_logged_in_user(request)
+    if user_type != 'admin':
+        messages.warning(request, "Admin access only.")
+        return redirect('login')
+    if export_name not in exports.EXPORTS:
+        raise Http404("Unknown export.")
+
+    start_date, end_date = report_range(request)[:2]
+    return exports.export_response(export_name, start_date, end_date)
+
+# --- Admin panel tabs ---
+# Every list in adminpanel.html is fetched on demand from one of these
+# endpoints. They render an HTML fragment (or JSON with ?format=json) and
+# take `q` (search), `sort` and `cursor` (keyset page) parameters, so a
+# page costs the same however many customers or posts there are.
+
+ADMIN_PAGE_SIZE = 25
+
+# sort value -> (label, keyset ordering); the first entry is the default
+CUSTOMER_SORTS = {
+    'newest': ('Newest first', ('-id',)),
+    'oldest': ('Oldest first', ('id',)),
+    'name': ('Name A-Z', ('name', 'id')),
+    'username': ('Username A-Z', ('username', 'id')),
+}
+SELLER_SORTS = CUSTOMER_SORTS
+ORDER_SORTS = {
+    'newest': ('Newest first', ('-created_at', '-id')),
+    'oldest': ('Oldest first', ('created_at', 'id')),
+}
+POST_SORTS = {
+    'newest': ('Newest first', ('-created_at', '-id')),
+    'oldest': ('Oldest first', ('created_at', 'id')),
+}
+PRODUCT_SALES_SORTS = {
+    'profit': ('Highest profit', ('-total_profit', 'product_id')),
+    'quantity': ('Most sold', ('-total_quantity_sold', 'product_id')),
+    'revenue': ('Highest revenue', ('-total_revenue', 'product_id')),
+}
+SELLER_SALES_SORTS = {
+    'profit': ('Highest profit', ('-total_profit', 'seller_id')),
+    'quantity': ('Most sold', ('-total_quantity_sold', 'seller_id')),
+    'revenue': ('Highest revenue', ('-total_revenue', 'seller_id')),
+}
+
+
+def admin_fragment(view):
+    """Admin-only tab endpoint: answers 403 rather than redirecting a fetch() to the login page."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user_type, _ = get_logged_in_user(request)
+        if user_type != 'admin':
+            return HttpResponseForbidden("Admin access only.")
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _json_value(value):
+    if isinstance(value, FieldFile):
+        return value.url if value else None
+    return value
+
+
+def admin_listing(request, queryset, search_fields, sorts, template, json_fields, extra_context=None):
+    """Search, sort and keyset-paginate `queryset` for one admin tab."""
+    query = request.GET.get('q', '').strip()
+    if query:
+        condition = Q()
+        for field in search_fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        queryset = queryset.filter(condition)
+
+    sort = request.GET.get('sort')
+    if sort not in sorts:
+        sort = next(iter(sorts))
+    page = KeysetPaginator(queryset, ADMIN_PAGE_SIZE, sorts[sort][1]).get_page(request.GET.get('cursor'))
+
+    if request.GET.get('format') == 'json':
+        rows = [
+            {field: _json_value(row[field] if isinstance(row, dict) else getattr(row, field)) for field in json_fields}
+            for row in page
+        ]
+        return JsonResponse({'results': rows, 'next': page.next_cursor, 'previous': page.previous_cursor})
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    return render(request, template, {
+        'page': page,
+        'q': query,
+        'sort': sort,
+        'sort_options': [(value, label) for value, (label, _) in sorts.items()],
+        'endpoint': request.path,
+        'querystring': params.urlencode(),
+        **(extra_context or {}),
+    })
+
+
+@admin_fragment
+def admin_customers(request):
+    return admin_listing(
+        request,
+        Customer.objects.only('id', 'name', 'username', 'email', 'phone', 'address'),
+        search_fields=('name', 'username', 'email', 'phone'),
+        sorts=CUSTOMER_SORTS,
+        template='adminpanel_customers.html',
+        json_fields=('id', 'name', 'username', 'email', 'phone', 'address'),
+    )
+
+
+@admin_fragment
+def admin_sellers(request):
+    return admin_listing(
+        request,
+        Seller.objects.filter(is_approved=True).defer('password'),
+        search_fields=('name', 'username', 'email', 'phone', 'kudumbasree_details'),
+        sorts=SELLER_SORTS,
+        template='adminpanel_sellers.html',
+        json_fields=('id', 'name', 'username', 'email', 'phone', 'kudumbasree_details'),
+    )
+
+
+@admin_fragment
+def admin_pending_sellers(request):
+    return admin_listing(
+        request,
+        Seller.objects.filter(is_approved=False).defer('password'),
+        search_fields=('name', 'username', 'email', 'phone', 'kudumbasree_details'),
+        sorts=SELLER_SORTS,
+        template='adminpanel_approvals.html',
+        json_fields=('id', 'name', 'username', 'email', 'phone', 'kudumbasree_details', 'passbook'),
+    )
+
+
+@admin_fragment
+def admin_posts(request):
+    return admin_listing(
+        request,
+        CommunityPost.objects.all(),
+        search_fields=('description',),
+        sorts=POST_SORTS,
+        template='adminpanel_posts.html',
+        json_fields=('id', 'description', 'image', 'created_at'),
+    )
+
+
+@admin_fragment
+def admin_orders(request):
+    status = request.GET.get('status', '')
+    orders = Order.objects.select_related('customer')
+    if status in OrderStatus.values:
+        orders = orders.filter(status=status)
+    else:
+        status = ''
+    return admin_listing(
+        request,
+        orders,
+        search_fields=('customer__name', 'first_name', 'last_name', 'email', 'phone'),
+        sorts=ORDER_SORTS,
+        template='adminpanel_orders.html',
+        json_fields=('id', 'customer_id', 'total_price', 'status', 'created_at', 'city'),
+        extra_context={
+            'status': status,
+            'status_options': OrderStatus.choices,
+            'order_transitions': [(value, OrderStatus(value).label) for value in OrderStatus.values[1:]],
+        },
+    )
+
+
+def admin_update_orders(request):
+    """Move every seller's share of the selected orders to one status."""
+    user_type, _ = get_logged_in_user(request)
+    if user_type != 'admin':
+        messages.warning(request, "Admin access only.")
+        return redirect('login')
+
+    if request.method == 'POST':
+        order_ids = [int(value) for value in request.POST.getlist('order_ids') if value.isdigit()]
+        to_status = request.POST.get('status')
+        if not order_ids or to_status not in OrderStatus.values:
+            messages.error(request, "Select some orders and a status.")
+        else:
+            moved = fulfilment.transition(SellerOrder.objects.filter(order_id__in=order_ids), to_status, 'admin')
+            messages.success(request, f'{moved} seller order(s) marked as {OrderStatus(to_status).label.lower()}.')
+    return redirect(reverse('admin_dashboard') + '#orders-section')
+
+
+@admin_fragment
+def admin_report(request):
+    """Sales totals for the selected range plus the first page of both breakdowns."""
+    start_date, end_date = report_range(request)[:2]
+    range_params = {'start': start_date.isoformat(), 'end': end_date.isoformat()}
+    totals = rollups.sales_totals(start_date, end_date)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({**range_params, **totals})
+
+    product_page = KeysetPaginator(
+        rollups.product_sales(start_date, end_date), ADMIN_PAGE_SIZE, PRODUCT_SALES_SORTS['profit'][1]
+    ).get_page()
+    seller_page = KeysetPaginator(
+        rollups.seller_sales(start_date, end_date), ADMIN_PAGE_SIZE, SELLER_SALES_SORTS['profit'][1]
+    ).get_page()
+    return render(request, 'adminpanel_report.html', {
+        **totals,
+        'range_querystring': urlencode(range_params),
+        'range_params': list(range_params.items()),
+        'product_page': product_page,
+        'seller_page': seller_page,
+        'product_sort_options': [(value, label) for value, (label, _) in PRODUCT_SALES_SORTS.items()],
+        'seller_sort_options': [(value, label) for value, (label, _) in SELLER_SALES_SORTS.items()],
+    })
+
+
+
+@admin_fragment
+def admin_trends(request):
+    """Revenue, profit and units per day/week/month over a multi-year window."""
+    today = timezone.localdate()
+    period = request.GET.get('period') if request.GET.get('period') in trends.PERIODS else 'month'
+    group = request.GET.get('group') if request.GET.get('group') in trends.GROUPS else 'total'
+    try:
+        start_date = datetime.date.fromisoformat(request.GET.get('start', ''))
+        end_date = datetime.date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        # Default to this year and the last one, so every month has its year-ago neighbour
+        start_date, end_date = datetime.date(today.year - 1, 1, 1), today
+
+    rows = trends.sales_trends(start_date, end_date, period, group)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'start': start_date, 'end': end_date, 'period': period, 'group': group, 'results': rows,
+        })
+
+    peak = max((row['revenue'] for row in rows), default=0) or 1
+    return render(request, 'adminpanel_trends.html', {
+        'rows': [{**row, 'percent': round(100 * row['revenue'] / peak)} for row in rows],
+        'period': period,
+        'group': group,
+        'periods': list(trends.PERIODS),
+        'groups': list(trends.GROUPS),
+        'start_date': start_date,
+        'end_date': end_date,
+    })
+
+def _report_listing(request, queryset_for_range, search_fields, sorts, template, json_fields):
+    start_date, end_date = report_range(request)[:2]
+    return admin_listing(
+        request,
+        queryset_for_range(start_date, end_date),
+        search_fields=search_fields,
+        sorts=sorts,
+        template=template,
+        json_fields=json_fields,
+        extra_context={'range_params': [('start', start_date.isoformat()), ('end', end_date.isoformat())]},
+    )
+
+
+@admin_fragment
+def admin_report_products(request):
+    return _report_listing(
+        request, rollups.product_sales,
+        search_fields=('product__product_name', 'product__seller__name'),
+        sorts=PRODUCT_SALES_SORTS,
+        template='adminpanel_report_products.html',
+        json_fields=('product_id', 'product__product_name', 'product__seller__name',
+                     'total_quantity_sold', 'total_revenue', 'total_profit'),
+    )
+
+
+@admin_fragment
+def admin_report_sellers(request):
+    return _report_listing(
+        request, rollups.seller_sales,
+        search_fields=('seller__name',),
+        sorts=SELLER_SALES_SORTS,
+        template='adminpanel_report_sellers.html',
+        json_fields=('seller_id', 'seller__name', 'total_quantity_sold', 'total_revenue', 'total_profit'),
+    )
+
 # --- Seller Views ---
+SELLER_ORDER_PAGE_SIZE = 20
+
+
 def seller_dashboard(request):
     user_type, seller = get_logged_in_user(request)
     if user_type != 'seller':
@@ -315,13 +597,32 @@ def seller_dashboard(request):
         return redirect('login')
 
     products = Product.objects.filter(seller=seller)
-    orders = Order.objects.filter(items__product__seller=seller).distinct().order_by('-created_at')
     feedbacks = Feedback.objects.filter(seller=seller).order_by('-created_at')
 
+    # Order queue: the seller's own SellerOrder rows, newest first, a page at a time
+    order_status = request.GET.get('status', '')
+    seller_orders = SellerOrder.objects.filter(seller=seller).select_related('order__customer')
+    if order_status in OrderStatus.values:
+        seller_orders = seller_orders.filter(status=order_status)
+    else:
+        order_status = ''
+    paginator = KeysetPaginator(seller_orders, SELLER_ORDER_PAGE_SIZE, ordering=('-created_at', '-id'))
+    order_page = paginator.get_page(request.GET.get('cursor'))
+    for seller_order in order_page:
+        seller_order.next_statuses = [
+            (status, OrderStatus(status).label) for status in fulfilment.next_statuses(seller_order.status)
+        ]
+
     context = {
         'seller': seller,
+        'stats': seller_stats.for_seller(seller.id),
+        'recent_days': seller_stats.RECENT_DAYS,
+        'low_stock_threshold': seller_stats.LOW_STOCK_THRESHOLD,
         'products': products,
-        'orders': orders,
+        'order_page': order_page,
+        'order_status': order_status,
+        'order_statuses': OrderStatus.choices,
+        'order_transitions': [(status, OrderStatus(status).label) for status in OrderStatus.values[1:]],
         'feedbacks': feedbacks
     }
     return render(request, 'seller_dashboard.html', context)
@@ -332,7 +633,7 @@ def add_product(request):
     user_type, seller = get_logged_in_user(request)
     if user_type != 'seller' or request.method != 'POST':
         messages.warning(request, "Action requires seller login.")
-        return redirect('products_page')
+        return redirect('products')
 
     Product.objects.create(
         seller=seller,
@@ -341,7 +642,9 @@ def add_product(request):
         stock=request.POST.get('stock'),
         description=request.POST.get('description'),
         category=request.POST.get('category'),
-        photo=request.FILES.get('photo')
+        cost_price=request.POST.get('cost_price') or 0,
+        photo=request.FILES.get('photo'),
+        is_visible=seller.is_approved,
     )
     messages.success(request, "Product added successfully!")
     return redirect('seller_dashboard')
@@ -353,20 +656,80 @@ def update_product(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     if product.seller != seller or request.method != 'POST':
         messages.warning(request, "Not authorized.")
-        return redirect('products_page')
+        return redirect('products')
+
+    try:
+        stock_delta = int(request.POST.get('stock', product.stock)) - int(request.POST.get('stock_was', product.stock))
+    except ValueError:
+        messages.warning(request, "Stock must be a whole number.")
+        return redirect('seller_dashboard')
 
     product.product_name = request.POST.get('product_name', product.product_name)
     product.price = request.POST.get('price', product.price)
-    product.stock = request.POST.get('stock', product.stock)
+    product.cost_price = request.POST.get('cost_price') or product.cost_price
     product.description = request.POST.get('description', product.description)
     product.category = request.POST.get('category', product.category)
+    fields = ['product_name', 'price', 'cost_price', 'description', 'category']
     if request.FILES.get('photo'):
         product.photo = request.FILES.get('photo')
-    product.save()
+        fields.append('photo')
+    with transaction.atomic():
+        # Stock moves by what the seller changed, as in the grid, never to the figure the form was drawn with
+        adjust_stock({product.id: stock_delta} if stock_delta else {})
+        product.save(update_fields=fields)
     messages.success(request, "Product updated successfully!")
     return redirect('seller_dashboard')
 
 
+def import_products(request):
+    """Bulk-create or update the seller's products from a CSV and a zip of photos."""
+    user_type, seller = get_logged_in_user(request)
+    if user_type != 'seller' or request.method != 'POST':
+        messages.warning(request, "Action requires seller login.")
+        return redirect('products')
+
+    csv_file = request.FILES.get('products_csv')
+    if csv_file is None:
+        messages.warning(request, "Choose a CSV file to import.")
+        return redirect('seller_dashboard')
+    try:
+        result = product_import.import_products(seller, csv_file, request.FILES.get('photos_zip'))
+    except product_import.ImportFileError as error:
+        messages.warning(request, str(error))
+        return redirect('seller_dashboard')
+
+    return render(request, 'seller_import_result.html', {
+        'seller': seller,
+        'result': result,
+        'more_errors': result.error_count - len(result.errors),
+    })
+
+
+def bulk_update_products(request):
+    """Save the price, cost and stock grid on the seller dashboard in one UPDATE."""
+    user_type, seller = get_logged_in_user(request)
+    if user_type != 'seller' or request.method != 'POST':
+        messages.warning(request, "Action requires seller login.")
+        return redirect('products')
+
+    changes, errors = product_import.grid_changes(request.POST, Product.objects.filter(seller=seller))
+    updated = product_import.update_prices_and_stock(seller, changes)
+    if updated:
+        messages.success(request, f"{updated} product(s) updated.")
+    for name, error in errors:
+        messages.warning(request, f"{name} was not saved: {error}.")
+    return redirect('seller_dashboard')
+
+
+def product_import_template(request):
+    """An empty CSV with the import columns, for sellers to fill in."""
+    response = HttpResponse(
+        ''.join(exports.stream_csv(product_import.IMPORT_COLUMNS, [])), content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="products_template.csv"'
+    return response
+
+
 def delete_product(request, product_id):
     user_type, seller = get_logged_in_user(request)
     product = get_object_or_404(Product, id=product_id)
@@ -377,16 +740,25 @@ def delete_product(request, product_id):
         messages.success(request, "Product deleted.")
     return redirect('seller_dashboard')
 
+def _move_seller_orders(request, seller, order_ids, to_status):
+    """Apply one status change to the seller's share of `order_ids` and report how it went."""
+    moved = fulfilment.transition(
+        SellerOrder.objects.filter(seller=seller, order_id__in=order_ids), to_status, f'seller:{seller.id}',
+    )
+    label = OrderStatus(to_status).label.lower()
+    if moved:
+        messages.success(request, f'{moved} order(s) marked as {label}.')
+    if moved < len(order_ids):
+        messages.warning(request, f'{len(order_ids) - moved} order(s) could not be marked as {label}.')
+
+
 def confirm_order(request, order_id):
     user_type, seller = get_logged_in_user(request)
     if user_type != 'seller':
         messages.error(request, "Authorization error.")
         return redirect('login')
 
-    order = get_object_or_404(Order, id=order_id, items__product__seller=seller)
-    order.status = 'Confirmed'
-    order.save()
-    messages.success(request, f'Order #{order.id} has been confirmed.')
+    _move_seller_orders(request, seller, [order_id], OrderStatus.CONFIRMED)
     return redirect('seller_dashboard')
 
 def delete_order(request, order_id):
@@ -395,14 +767,24 @@ def delete_order(request, order_id):
         messages.error(request, "Authorization error.")
         return redirect('login')
 
-    order = Order.objects.filter(id=order_id, items__product__seller=seller).first()
-    if not order:
-        messages.error(request, "Order not found or not authorized.")
-        return redirect('seller_dashboard')
+    _move_seller_orders(request, seller, [order_id], OrderStatus.CANCELLED)
+    return redirect('seller_dashboard')
+
 
-    order.status = 'Cancelled'
-    order.save()
-    messages.warning(request, f'Order #{order.id} has been cancelled.')
+def update_seller_orders(request):
+    """Move the selected orders to one status, in a single statement however many are selected."""
+    user_type, seller = get_logged_in_user(request)
+    if user_type != 'seller':
+        messages.error(request, "Authorization error.")
+        return redirect('login')
+
+    if request.method == 'POST':
+        order_ids = [int(value) for value in request.POST.getlist('order_ids') if value.isdigit()]
+        to_status = request.POST.get('status')
+        if not order_ids or to_status not in OrderStatus.values:
+            messages.error(request, "Select some orders and a status.")
+        else:
+            _move_seller_orders(request, seller, order_ids, to_status)
     return redirect('seller_dashboard')
 
 
@@ -422,10 +804,10 @@ def delete_feedback(request, feedback_id):
 # --- Customer Views ---
 
 def customer_dashboard(request):
-    products = Product.objects.filter(seller__is_approved=True).order_by('-id')[:12]
+    products = Product.objects.filter(is_visible=True).order_by('-id')[:12]
     user_type, customer = get_logged_in_user(request)
     
-    cart_data = get_cart_context(customer)
+    cart_data = get_cart_context(get_customer_id(request))
     
     context = {
         'products': products,
@@ -436,42 +818,61 @@ def customer_dashboard(request):
     return render(request, 'index.html', context)
 
 
+PRODUCT_SORT_ORDERINGS = {
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+}
+
+
 def products_page(request):
-    products_list = Product.objects.filter(seller__is_approved=True).order_by('id')
-    user_type, customer = get_logged_in_user(request)
-    
-    # Search
+    products_list = Product.objects.filter(is_visible=True)
+    customer_id = get_customer_id(request)
+
+    # Sorting: explicit price sort, else relevance for searches, else id order
+    sort = request.GET.get('sort')
+    ordering = PRODUCT_SORT_ORDERINGS.get(sort, ('id',))
+
+    # Search (ranked by relevance)
     query = request.GET.get('q')
     if query:
-        products_list = products_list.filter(
-            Q(product_name__icontains=query) | Q(description__icontains=query)
-        )
+        products_list = search.search_products(products_list, query)
+        if sort not in PRODUCT_SORT_ORDERINGS:
+            ordering = ('search_rank', 'id')
+        # Sidebar counts describe the search results, not the whole catalog
+        catalog_facets = facets.compute_facets(products_list)
+    else:
+        catalog_facets = facets.catalog_facets()
 
    # Category Filter
     category = request.GET.get('category')
     if category:
-        products_list = products_list.filter(category__iexact=category)
+        products_list = products_list.filter(category=category)
 
     # Price Filter
     max_price = request.GET.get('max_price')
     if max_price:
         products_list = products_list.filter(price__lte=max_price)
 
-    # Pagination
-    paginator = Paginator(products_list, 30) # Show 30 products per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    cart_data = get_cart_context(customer)
-    
-    # Get all distinct categories for the filter sidebar
-    categories = Product.objects.filter(seller__is_approved=True).values_list('category', flat=True).distinct()
+    # Keyset pagination: the cursor carries the last (sort key, id) seen
+    paginator = KeysetPaginator(products_list, 30, ordering=ordering) # Show 30 products per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    total_count = cached_count(products_list)
+
+    # Query string for the pagination links, minus the cursor itself
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
+    filters.pop('page', None)
+
+    cart_data = get_cart_context(customer_id)
 
     context = {
         'products': page_obj, # Pass the paginated page object
+        'total_count': total_count,
+        'filter_querystring': filters.urlencode(),
         'cart_product_ids': cart_data['cart_product_ids'],
         'cart_item_count': cart_data['cart_item_count'],
-        'categories': categories,
+        'categories': catalog_facets['categories'],
+        'price_histogram': catalog_facets['price_histogram'],
     }
     return render(request, 'products.html', context)
 
@@ -488,8 +889,9 @@ def add_to_cart(request, product_id):
     if not created:
         messages.info(request, "Already in cart.")
     else:
+        invalidate_cart(customer.id)
         messages.success(request, "Added to cart.")
-    return redirect(request.META.get('HTTP_REFERER', 'products_page'))
+    return redirect(request.META.get('HTTP_REFERER', 'products'))
 
 
 def cart(request):
@@ -503,7 +905,7 @@ def cart(request):
     shipping = Decimal('50.00') if subtotal > 0 else Decimal('0.00')
     total = subtotal + shipping
     
-    cart_data = get_cart_context(customer)
+    cart_data = get_cart_context(customer.id)
 
     context = {
         'cart_items': cart_items,
@@ -533,6 +935,7 @@ def update_cart(request, item_id, action):
             # If quantity is 1 and they decrease, remove it
             cart_item.delete()
             messages.info(request, "Item removed from cart.")
+    invalidate_cart(customer.id)
     
     return redirect('cart')
 
@@ -544,6 +947,7 @@ def remove_from_cart(request, item_id):
 
     cart_item = get_object_or_404(CartItem, id=item_id, customer=customer)
     cart_item.delete()
+    invalidate_cart(customer.id)
     messages.success(request, "Item removed from your cart.")
     return redirect('cart')
 
@@ -553,12 +957,19 @@ def checkout(request):
         messages.warning(request, "Login to checkout.")
         return redirect('login')
 
-    cart_items = CartItem.objects.filter(customer=customer)
+    cart_items = CartItem.objects.filter(customer=customer).select_related('product')
     subtotal = sum(item.total_price for item in cart_items)
     shipping = Decimal('50.00') if subtotal > 0 else Decimal('0.00')
     total = subtotal + shipping
+
+    # Hold the stock while the customer pays
+    try:
+        reservations.reserve(customer, {item.product_id: item.quantity for item in cart_items})
+    except OutOfStockError as e:
+        messages.error(request, f"Sorry, not enough stock left for: {e}. Please update your cart.")
+        return redirect('cart')
     
-    cart_data = get_cart_context(customer)
+    cart_data = get_cart_context(customer.id)
     
     context = {
         'cart_items': cart_items,
@@ -566,103 +977,123 @@ def checkout(request):
         'shipping': shipping,
         'total': total,
         'cart_item_count': cart_data['cart_item_count'],
+        # Sent back with the order so a resubmitted form can't place it twice
+        'idempotency_key': uuid.uuid4().hex,
     }
     return render(request, 'checkout.html', context)
 
 
 
-@transaction.atomic
 def success(request):
     user_type, customer = get_logged_in_user(request)
     if user_type != 'customer':
         messages.warning(request, "Login to complete order.")
         return redirect('login')
 
-    cart_items = CartItem.objects.filter(customer=customer)
-    if request.method == 'POST' and cart_items.exists():
-        total_price = sum(item.total_price for item in cart_items) + Decimal('50.00')
-        
-        # Create the Order with address details
-        order = Order.objects.create(
-            customer=customer, 
-            total_price=total_price,
-            first_name=request.POST.get('first_name'),
-            last_name=request.POST.get('last_name'),
-            address=request.POST.get('address'),
-            city=request.POST.get('city'),
-            state=request.POST.get('state'),
-            zip_code=request.POST.get('zip'),
-            email=request.POST.get('email'),
-            phone=request.POST.get('phone'),
-        )
-        
-        # Create OrderItems and decrease product stock
-        for item in cart_items:
-            OrderItem.objects.create(
-                order=order, 
-                product=item.product, 
-                quantity=item.quantity, 
-                price=item.product.price,
-                cost_price=item.product.cost_price  # <-- This line is crucial
+    if request.method == 'POST':
+        # Address details captured at the time of order
+        shipping = {
+            'first_name': request.POST.get('first_name'),
+            'last_name': request.POST.get('last_name'),
+            'address': request.POST.get('address'),
+            'city': request.POST.get('city'),
+            'state': request.POST.get('state'),
+            'zip_code': request.POST.get('zip'),
+            'email': request.POST.get('email'),
+            'phone': request.POST.get('phone'),
+        }
+        try:
+            order, created = place_order(
+                customer, shipping,
+                payment_id=request.POST.get('razorpay_payment_id'),
+                idempotency_key=request.POST.get('idempotency_key'),
             )
-            product = item.product
-            product.stock -= item.quantity
-            product.save()
-        
-        # Create the Payment record
-        Payment.objects.create(
-            order=order,
-            customer=customer,
-            razorpay_payment_id=request.POST.get('razorpay_payment_id'),
-            amount=total_price
-        )
-        
-        # Clear the user's cart
-        cart_items.delete()
-        
+        except OutOfStockError as e:
+            messages.error(request, f"Sorry, not enough stock left for: {e}. Your order was not placed.")
+            return redirect('cart')
+        except CheckoutConflictError:
+            messages.error(request, "This payment is already linked to another order. Please contact us.")
+            return redirect('cart')
+        if created:
+            invalidate_cart(customer.id)
+
     return render(request, 'Success.html')
 
 
 
 def about(request):
-    user_type, customer = get_logged_in_user(request)
-    cart_data = get_cart_context(customer)
+    cart_data = get_cart_context(get_customer_id(request))
     return render(request, 'aboutus.html', {'cart_item_count': cart_data['cart_item_count']})
 
 
 def community(request):
-    user_type, customer = get_logged_in_user(request)
-    cart_data = get_cart_context(customer)
-    post = CommunityPost.objects.all()
-    return render(request, 'community.html', {'cart_item_count': cart_data['cart_item_count'],'post':post})
+    cart_data = get_cart_context(get_customer_id(request))
+    return render(request, 'community.html', {
+        'cart_item_count': cart_data['cart_item_count'],
+        'page': feed.feed_page(request.GET.get('cursor')),
+        'fragment_timeout': feed.POST_FRAGMENT_TIMEOUT,
+    })
+
+
+def community_feed(request):
+    """The next batch of community posts, as an HTML fragment for the feed's infinite scroll."""
+    return render(request, 'community_posts.html', {
+        'page': feed.feed_page(request.GET.get('cursor')),
+        'fragment_timeout': feed.POST_FRAGMENT_TIMEOUT,
+    })
+
+
+ORDER_HISTORY_PAGE_SIZE = 20
 
 
 def my_orders(request):
-    user_type, customer = get_logged_in_user(request)
-    if user_type != 'customer':
+    customer_id = get_customer_id(request)
+    if not customer_id:
         messages.warning(request, "Login to view orders.")
         return redirect('login')
 
-    orders = Order.objects.filter(customer=customer).order_by('-created_at')
-    cart_data = get_cart_context(customer)
-    return render(request, 'myorders.html', {'orders': orders, 'cart_item_count': cart_data['cart_item_count']})
+    # One query for the page of orders and one for all their items and products.
+    # Once the live orders run out, "Older orders" carries on into the archive.
+    archived = request.GET.get('archive') == '1'
+    page = KeysetPaginator(
+        archive.customer_orders(customer_id, archived), ORDER_HISTORY_PAGE_SIZE, ('-created_at', '-id'),
+    ).get_page(request.GET.get('cursor'))
+    params = {'archive': 1} if archived else {}
+    newer_url = older_url = None
+    if page.has_previous:
+        newer_url = '?' + urlencode({**params, 'cursor': page.previous_cursor})
+    elif archived:
+        newer_url = reverse('my_orders')
+    if page.has_next:
+        older_url = '?' + urlencode({**params, 'cursor': page.next_cursor})
+    elif not archived and ArchivedOrder.objects.filter(customer_id=customer_id).exists():
+        older_url = '?' + urlencode({'archive': 1})
+    cart_data = get_cart_context(customer_id)
+    return render(request, 'myorders.html', {
+        'page': page,
+        'newer_url': newer_url,
+        'older_url': older_url,
+        'cart_item_count': cart_data['cart_item_count'],
+    })
 
 def order_detail(request, order_id):
-    user_type, customer = get_logged_in_user(request)
-    if user_type != 'customer':
+    customer_id = get_customer_id(request)
+    if not customer_id:
         messages.warning(request, "Login to view this order.")
         return redirect('login')
 
-    order = get_object_or_404(Order, id=order_id, customer=customer)
-    order_items = OrderItem.objects.filter(order=order)
+    # The order with its payment, then the items with their products and sellers: two queries however big
+    order = archive.customer_order(customer_id, order_id)
+    if order is None:
+        raise Http404("Order not found.")
     try:
-        payment = Payment.objects.get(order=order)
-    except Payment.DoesNotExist:
+        payment = order.payment
+    except ObjectDoesNotExist:
         payment = None
 
     context = {
         'order': order,
-        'order_items': order_items,
+        'order_items': order.items.all(),
         'payment': payment,
         'cart_item_count': 0
     }